@@ -0,0 +1,122 @@
+"""Topic-keyed registry of non-informative terms, skipped by term extraction.
+
+Terms are loaded once from `blacklists/<topic>.txt` (plus `common.txt` for every
+topic) and matched case-insensitively in O(1).
+"""
+
+import logging
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from askem.retriever.data_models import Topic, to_topic
+
+BLACKLIST_DIR = Path(__file__).parent / "blacklists"
+COMMON = "common"
+
+
+class Blacklist:
+    """Immutable set of terms, matched case-insensitively."""
+
+    def __init__(self, terms: Iterable[str] = ()) -> None:
+        self.terms = frozenset(terms)
+        self.folded = frozenset(term.casefold() for term in self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.terms or term.casefold() in self.folded
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __or__(self, other: "Blacklist") -> "Blacklist":
+        return Blacklist(self.terms | other.terms)
+
+
+def get_path(name: str) -> Path:
+    return BLACKLIST_DIR / f"{name}.txt"
+
+
+def read_terms(path: Path) -> list[str]:
+    """Read one term per line, skipping blank lines and `#` comments."""
+
+    if not path.exists():
+        return []
+    lines = (line.strip() for line in path.read_text().splitlines())
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+@lru_cache
+def load_blacklist(name: str) -> Blacklist:
+    """Load a blacklist data file once per process."""
+    return Blacklist(read_terms(get_path(name)))
+
+
+@lru_cache
+def _merge_blacklists(names: tuple[str, ...]) -> Blacklist:
+    blacklist = load_blacklist(COMMON)
+    for name in names:
+        blacklist = blacklist | load_blacklist(name)
+    return blacklist
+
+
+def get_blacklist(*topics: Topic | str) -> Blacklist:
+    """Blacklist of one or more topics, always including the common stopterms.
+
+    Topics are normalized with `to_topic`, e.g. `covid` resolves to `xdd-covid-19`.
+    The merged blacklist of each topic combination is built once.
+    """
+
+    names = set()
+    for topic in topics:
+        try:
+            names.add(to_topic(topic).value)
+        except ValueError:
+            logging.warning(f"Topic {topic} not found in blacklist.")
+    return _merge_blacklists(tuple(sorted(names)))
+
+
+def mine_blacklist(
+    document_terms: Iterable[Iterable[str]], min_document_frequency: float = 0.2
+) -> list[str]:
+    """Mine corpus-wide non-informative terms.
+
+    A term found in at least `min_document_frequency` of the documents (e.g. `COVID`
+    in the COVID-19 corpus) does not discriminate between them.
+
+    Args:
+        document_terms: Terms of each document of a topic's corpus.
+        min_document_frequency: Fraction of documents a term must appear in.
+    """
+
+    document_frequency = Counter()
+    n_documents = 0
+    for terms in document_terms:
+        document_frequency.update(set(terms))
+        n_documents += 1
+
+    if not n_documents:
+        return []
+    threshold = min_document_frequency * n_documents
+    return sorted(t for t, n in document_frequency.items() if n >= threshold)
+
+
+def save_blacklist(topic: Topic | str, terms: Iterable[str]) -> Path:
+    """Merge mined terms into a topic's blacklist data file."""
+
+    topic = to_topic(topic)
+    path = get_path(topic.value)
+    existing = path.read_text().splitlines() if path.exists() else []
+    known = {line.strip().casefold() for line in existing}
+    new = sorted(term for term in set(terms) if term.casefold() not in known)
+
+    with open(path, "a") as f:
+        f.writelines(f"{term}\n" for term in new)
+
+    load_blacklist.cache_clear()
+    _merge_blacklists.cache_clear()
+    logging.info(f"Added {len(new)} terms to {path}")
+    return path
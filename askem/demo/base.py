@@ -1,10 +1,9 @@
 from dataclasses import dataclass
 from pathlib import Path
 
-import requests
 import streamlit as st
-from citation import to_apa
 from connector import query_react
+from metadata import fetch_attributes, get_citations, get_title
 
 
 @dataclass
@@ -35,27 +34,22 @@ class Message:
     link: str = None
 
 
-def append_citation(document: dict) -> None:
-    """Append citation to document."""
+async def append_metadata(documents: list[dict]) -> None:
+    """Append title and citation to documents, with one batched metadata lookup.
 
-    try:
-        document["citation"] = to_apa(document["paper_id"], in_text=True)
-    except Exception:
-        document["citation"] = document["paper_id"]
+    Metadata returned inline by the retriever (`paper`) is used without lookup.
+    """
 
+    missing = [doc["paper_id"] for doc in documents if not doc.get("paper")]
+    records = await fetch_attributes(missing) if missing else {}
+    for doc in documents:
+        if doc.get("paper"):
+            records[doc["paper_id"]] = {"id": doc["paper_id"], **doc["paper"]}
 
-def append_title(document: dict) -> None:
-    """Append citation to document."""
-
-    try:
-        xdd_response = requests.get(
-            f"https://xdd.wisc.edu/api/v2/articles/?docid={document['paper_id']}"
-        )
-        xdd_response.raise_for_status()
-        xdd_data = xdd_response.json()
-        document["title"] = xdd_data["success"]["data"][0]["title"]
-    except Exception:
-        document["title"] = ""
+    citations = get_citations(records, in_text=True)
+    for doc in documents:
+        doc["title"] = get_title(records.get(doc["paper_id"]))
+        doc["citation"] = citations.get(doc["paper_id"], doc["paper_id"])
 
 
 def fix_string(string: str) -> str:
@@ -98,10 +92,8 @@ def chat_log(
 
 
 def render_doc(doc: dict) -> None:
-    """Render document in chat."""
+    """Render document in chat, `append_metadata` must be called first."""
 
-    append_citation(doc)
-    append_title(doc)
     chat_log(
         role="assistant",
         content=doc["text_content"],
@@ -112,13 +104,14 @@ def render_doc(doc: dict) -> None:
     )
 
 
-def render_chunk(chunk: dict, verbose: bool) -> None:
+async def render_chunk(chunk: dict, verbose: bool) -> None:
     """Decode different types of chunk."""
 
     if "thoughts" in chunk and verbose:
         chat_log(role="assistant", content=chunk["thoughts"])
 
     if "used_docs" in chunk:
+        await append_metadata(chunk["used_docs"])
         for doc in chunk["used_docs"]:
             render_doc(doc)
 
@@ -139,7 +132,7 @@ async def search(
 
     # Call the API
     with st.spinner("Running... It may take 30 seconds or longer if you choose GPT-4."):
-        async for chunk in query_react(
+        for chunk in query_react(
             question=question,
             topic=topic,
             top_k=top_k,
@@ -147,4 +140,4 @@ async def search(
             screening_top_k=screening_top_k,
         ):
             with st.spinner():
-                render_chunk(chunk, verbose=verbose)
+                await render_chunk(chunk, verbose=verbose)
@@ -0,0 +1,72 @@
+"""Benchmark APA citation formatting, per document vs. batched.
+
+Usage:
+    # Synthetic attributes (offline)
+    python bench_citation.py --n 100
+
+    # Real attributes of the docids in a file (one per line), fetched from xDD once
+    python bench_citation.py --docids-file docids.txt
+"""
+
+import argparse
+import asyncio
+import time
+
+from citation import attributes_to_apa, attributes_to_apa_batch, get_apa_style
+from metadata import MetadataStore, fetch_attributes
+
+
+def synthetic_attributes(n: int) -> list[dict]:
+    """Make `n` fake article attributes."""
+    return [
+        {
+            "id": f"{i:024x}",
+            "author": f"Doe, Jane and Smith, John{i}",
+            "title": f"A study of topic number {i}",
+            "year": str(2000 + i % 24),
+            "journal": "Journal of Benchmarks",
+            "volume": str(i),
+            "pages": f"{i}--{i + 10}",
+        }
+        for i in range(n)
+    ]
+
+
+def rate(n: int, seconds: float) -> str:
+    return f"{n / seconds:,.0f} citations/sec ({seconds * 1000:.1f} ms)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark APA citation formatting.")
+    parser.add_argument("--n", type=int, default=100, help="Number of documents.")
+    parser.add_argument("--docids-file", type=str, help="File with one docid per line.")
+    args = parser.parse_args()
+
+    if args.docids_file:
+        with open(args.docids_file, "r") as f:
+            docids = f.read().split()
+        attrs_list = list(asyncio.run(fetch_attributes(docids)).values())
+    else:
+        attrs_list = synthetic_attributes(args.n)
+
+    n = len(attrs_list)
+    get_apa_style()  # Exclude one-off style construction from timings
+
+    start = time.perf_counter()
+    for attrs in attrs_list:
+        attributes_to_apa(attrs, in_text=True)
+    print(f"Per document: {rate(n, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    attributes_to_apa_batch(attrs_list, in_text=True)
+    print(f"Batched:      {rate(n, time.perf_counter() - start)}")
+
+    store = MetadataStore(path=":memory:")
+    store.citations(attrs_list, in_text=True)
+    start = time.perf_counter()
+    store.citations(attrs_list, in_text=True)
+    print(f"Memoized:     {rate(n, time.perf_counter() - start)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List
 
 import requests
 from pybtex.database import parse_string
@@ -21,7 +22,19 @@ def get_attributes(doc_id: str) -> Dict[str, str]:
 
     response = requests.get(url, timeout=2)
     data = response.json()
-    article = data["success"]["data"][0]
+    return parse_article(data["success"]["data"][0])
+
+
+def parse_article(article: Dict) -> Dict[str, str]:
+    """
+    This function extracts the citation attributes from an XDD API article record.
+
+    Args:
+        article (dict): An article record from the XDD articles API.
+
+    Returns:
+        dict: The attributes of the document.
+    """
 
     attributes = {"id": article["_gddid"]}
 
@@ -80,6 +93,38 @@ def to_bibtex(attrs: Dict) -> str:
     return bibtex
 
 
+@lru_cache
+def get_apa_style():
+    """
+    This function constructs the pybtex APA formatting style once per process.
+
+    Returns:
+        The pybtex APA style instance.
+    """
+
+    return find_plugin("pybtex.style.formatting", "apa")()
+
+
+def render_citation(entry, in_text: bool = False) -> str:
+    """
+    This function renders a formatted pybtex entry as an HTML APA citation.
+
+    Args:
+        entry: A formatted pybtex bibliography entry.
+        in_text (bool, optional): Whether to return an in-text citation or not. Defaults to False.
+
+    Returns:
+        str: The APA citation string.
+    """
+
+    citation = entry.text.render_as("html")
+    if not in_text:
+        return citation
+
+    author_year = citation.split(")")[0]
+    return author_year + ")"
+
+
 def to_citation(bibtex: str, in_text: bool = False) -> str:
     """
     This function converts a BibTeX string into an APA citation string using the pybtex library.
@@ -94,15 +139,9 @@ def to_citation(bibtex: str, in_text: bool = False) -> str:
     """
 
     bib_data = parse_string(bibtex, "bibtex")
-    apa_style = find_plugin("pybtex.style.formatting", "apa")()
-    bibliography = apa_style.format_bibliography(bib_data)  # type: ignore
+    bibliography = get_apa_style().format_bibliography(bib_data)  # type: ignore
     for entry in bibliography:
-        citation = entry.text.render_as("html")
-        if not in_text:
-            return citation
-
-        author_year = citation.split(")")[0]
-        return author_year + ")"
+        return render_citation(entry, in_text=in_text)
 
 
 def format_citation(attrs: dict, in_text=False):
@@ -153,6 +192,7 @@ def format_citation(attrs: dict, in_text=False):
     return citation
 
 
+@lru_cache(maxsize=4096)
 def to_apa(doc_id: str, in_text: bool = False) -> str:
     """
     This function converts a document from the XDD API into an APA citation.
@@ -168,6 +208,22 @@ def to_apa(doc_id: str, in_text: bool = False) -> str:
     """
 
     attrs = get_attributes(doc_id)
+    return attributes_to_apa(attrs, in_text=in_text)
+
+
+def attributes_to_apa(attrs: Dict, in_text: bool = False) -> str:
+    """
+    This function converts document attributes into an APA citation.
+    It tries to generate the citation using bibtex_to_apa and falls back to manual formatting using format_citation.
+
+    Args:
+        attrs (dict): A dictionary containing document attributes.
+        in_text (bool, optional): Whether to return an in-text citation or not. Defaults to False.
+
+    Returns:
+        str: The APA citation string representing the document.
+    """
+
     try:
         bibtex = to_bibtex(attrs)
         citation = to_citation(bibtex, in_text=in_text)
@@ -175,3 +231,35 @@ def to_apa(doc_id: str, in_text: bool = False) -> str:
         citation = format_citation(attrs, in_text=in_text)
 
     return citation
+
+
+def attributes_to_apa_batch(
+    attrs_list: List[Dict], in_text: bool = False
+) -> Dict[str, str]:
+    """
+    This function converts many documents' attributes into APA citations with a single format_bibliography call.
+    If the batch fails to parse or format, each document falls back to attributes_to_apa.
+
+    Args:
+        attrs_list (list): A list of dictionaries containing document attributes.
+        in_text (bool, optional): Whether to return in-text citations or not. Defaults to False.
+
+    Returns:
+        dict: The APA citation strings keyed by document id.
+    """
+
+    if not attrs_list:
+        return {}
+
+    try:
+        bibtex = "\n".join([to_bibtex(attrs) for attrs in attrs_list])
+        bib_data = parse_string(bibtex, "bibtex")
+        bibliography = get_apa_style().format_bibliography(bib_data)  # type: ignore
+        return {
+            entry.key: render_citation(entry, in_text=in_text) for entry in bibliography
+        }
+    except Exception:
+        return {
+            attrs["id"]: attributes_to_apa(attrs, in_text=in_text)
+            for attrs in attrs_list
+        }
@@ -1,22 +1,55 @@
-import ast
 import os
-from typing import AsyncGenerator
+from functools import lru_cache
+from typing import Generator
 
-from httpx import AsyncClient
+import orjson
+from httpx import Client, Limits, Response
 
 
-async def query_react(
+@lru_cache
+def get_client() -> Client:
+    """Get the pooled retriever client, shared by all sessions and reruns.
+
+    Streamlit runs each rerun in a new event loop (`asyncio.run`), so the client is
+    synchronous and lives as long as the process, its connections are reused across
+    questions. `httpx.Client` is thread-safe.
+    """
+
+    return Client(
+        base_url=os.getenv("RETRIEVER_URL"),
+        headers={
+            "Api-Key": os.getenv("RETRIEVER_APIKEY"),
+            "Accept": "application/x-ndjson",
+        },
+        timeout=300,
+        limits=Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+def iter_ndjson(response: Response) -> Generator[dict, None, None]:
+    """Decode a streaming NDJSON response, one message per line.
+
+    `iter_lines` buffers partial lines across network chunks, blank lines are
+    heartbeats and skipped.
+    """
+
+    for line in response.iter_lines():
+        if line.strip():
+            yield orjson.loads(line)
+
+
+def query_react(
     question: str,
     topic: str,
     top_k: int,
     model_name: str,
     screening_top_k: int = None,
-) -> AsyncGenerator[dict, None]:
+) -> Generator[dict, None, None]:
     """Access react in streaming mode.
 
     Usage:
     ```
-    async for chunk in query_react(
+    for chunk in query_react(
         question="What is COVID-19?",
         topic="covid",
         top_k=3,
@@ -27,10 +60,6 @@ async def query_react(
     ```
     """
 
-    headers = {
-        "Api-Key": os.getenv("RETRIEVER_APIKEY"),
-    }
-
     data = {
         "question": question,
         "topic": topic,
@@ -38,14 +67,9 @@ async def query_react(
         "model_name": model_name,
         "doc_type": "paragraph",  # TODO: Move this to UI
         "screening_top_k": screening_top_k,
+        "include_metadata": True,
     }
 
-    url = os.getenv("RETRIEVER_URL") + "/react_streaming"
-
-    async with AsyncClient(headers=headers, timeout=300).stream(
-        "POST", url, json=data
-    ) as response:
-        async for chunk in response.aiter_raw():
-            chunk = chunk.decode("utf-8")
-            if chunk:  # Only yield non-empty chunks
-                yield ast.literal_eval(chunk)
+    with get_client().stream("POST", "/react_streaming", json=data) as response:
+        response.raise_for_status()
+        yield from iter_ndjson(response)
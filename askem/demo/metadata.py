@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from citation import attributes_to_apa_batch, parse_article
+from httpx import AsyncClient
+
+XDD_ARTICLES_URL = "https://xdd.wisc.edu/api/articles"
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "/tmp/askem_metadata.sqlite")
+METADATA_TTL = 7 * 24 * 3600  # seconds
+XDD_BATCH_SIZE = 50  # docids per xDD request
+
+
+class MetadataStore:
+    """Article attributes cache: in-memory LRU backed by an on-disk sqlite TTL cache.
+
+    The store is shared by all Streamlit sessions, so the LRUs and the sqlite
+    connection are guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        path: str = METADATA_CACHE_PATH,
+        ttl: float = METADATA_TTL,
+        max_size: int = 4096,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._citations = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles "
+            "(doc_id TEXT PRIMARY KEY, attributes TEXT, fetched_at REAL)"
+        )
+
+    def _remember(self, cache: OrderedDict, key, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def get_many(self, doc_ids: list[str]) -> dict[str, dict]:
+        """Get cached attributes, skipping missing or expired doc_ids."""
+
+        found = {}
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self._memory:
+                    self._memory.move_to_end(doc_id)
+                    found[doc_id] = self._memory[doc_id]
+
+            missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._db.execute(
+                    "SELECT doc_id, attributes FROM articles "
+                    f"WHERE doc_id IN ({placeholders}) AND fetched_at > ?",
+                    [*missing, time.time() - self.ttl],
+                ).fetchall()
+                for doc_id, attributes in rows:
+                    found[doc_id] = json.loads(attributes)
+                    self._remember(self._memory, doc_id, found[doc_id])
+        return found
+
+    def set_many(self, records: dict[str, dict]) -> None:
+        """Store attributes in memory and on disk."""
+
+        now = time.time()
+        rows = [(doc_id, json.dumps(attrs), now) for doc_id, attrs in records.items()]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+            for doc_id, attrs in records.items():
+                self._remember(self._memory, doc_id, attrs)
+
+    def citations(self, attrs_list: list[dict], in_text: bool = False) -> dict:
+        """Get APA citations of articles, memoized by (doc_id, in_text).
+
+        Uncached citations are formatted together in one pybtex call, outside the lock.
+        """
+
+        found = {}
+        with self._lock:
+            for attrs in attrs_list:
+                key = (attrs["id"], in_text)
+                if key in self._citations:
+                    self._citations.move_to_end(key)
+                    found[attrs["id"]] = self._citations[key]
+
+        missing = [attrs for attrs in attrs_list if attrs["id"] not in found]
+        if missing:
+            formatted = attributes_to_apa_batch(missing, in_text)
+            with self._lock:
+                for doc_id, citation in formatted.items():
+                    self._remember(self._citations, (doc_id, in_text), citation)
+            found.update(formatted)
+        return found
+
+
+STORE = MetadataStore()
+
+
+async def _fetch_batch(client: AsyncClient, doc_ids: list[str]) -> dict[str, dict]:
+    """Fetch attributes of a batch of docids in a single xDD request."""
+
+    try:
+        response = await client.get(
+            XDD_ARTICLES_URL, params={"docid": ",".join(doc_ids)}
+        )
+        response.raise_for_status()
+        articles = response.json()["success"]["data"]
+    except Exception as e:
+        logging.warning(f"Failed to fetch xDD metadata for {doc_ids}: {e}")
+        return {}
+
+    attributes = [parse_article(article) for article in articles]
+    return {attrs["id"]: attrs for attrs in attributes}
+
+
+async def fetch_attributes(
+    doc_ids: list[str], store: MetadataStore = STORE
+) -> dict[str, dict]:
+    """Get article attributes of many docids, fetching uncached ones concurrently."""
+
+    doc_ids = list(dict.fromkeys(doc_ids))  # Deduplicate, keep order
+    records = store.get_many(doc_ids)
+    missing = [doc_id for doc_id in doc_ids if doc_id not in records]
+
+    if missing:
+        batches = [
+            missing[i : i + XDD_BATCH_SIZE]
+            for i in range(0, len(missing), XDD_BATCH_SIZE)
+        ]
+        async with AsyncClient(timeout=10) as client:
+            results = await asyncio.gather(
+                *[_fetch_batch(client, batch) for batch in batches]
+            )
+
+        fetched = {k: v for result in results for k, v in result.items()}
+        store.set_many(fetched)
+        records.update(fetched)
+
+    logging.debug(f"Metadata for {len(doc_ids)} docids, {len(missing)} fetched")
+    return records
+
+
+def get_title(attrs: dict | None) -> str:
+    """Get article title from its attributes."""
+    if not attrs:
+        return ""
+    return attrs.get("title", "")
+
+
+def get_citations(
+    records: dict[str, dict], in_text: bool = True, store: MetadataStore = STORE
+) -> dict[str, str]:
+    """Get APA citations of articles keyed by docid, falling back to the docid."""
+
+    try:
+        citations = store.citations(list(records.values()), in_text=in_text)
+    except Exception as e:
+        logging.warning(f"Failed to format citations: {e}")
+        citations = {}
+
+    return {
+        doc_id: citations.get(attrs["id"], doc_id) for doc_id, attrs in records.items()
+    }
@@ -78,6 +78,43 @@ def get_xdd_ids(url: str) -> list[str]:
     return data
 
 
+@tenacity.retry(wait=tenacity.wait_fixed(10), stop=tenacity.stop_after_attempt(3))
+def get_article_metadata(docids: list[str], batch_size: int = 100) -> dict[str, dict]:
+    """Get bibliographic metadata of articles from xDD articles API in bulk.
+
+    Returns:
+        Mapping of docid to `Paper` properties (title, author, year, journal, url).
+    """
+
+    metadata = {}
+    for i in range(0, len(docids), batch_size):
+        batch = docids[i : i + batch_size]
+        response = requests.get(
+            "https://xdd.wisc.edu/api/articles",
+            params={"docid": ",".join(batch)},
+            timeout=30,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if "success" not in data:
+            logging.error(f"Error when calling xdd articles API for {batch}: {data}")
+            raise ValueError("Unsuccessful xDD request.")
+
+        for article in data["success"]["data"]:
+            paper = {"paper_id": article["_gddid"]}
+            if article.get("author"):
+                paper["author"] = " and ".join([a["name"] for a in article["author"]])
+            for field in ["title", "year", "journal"]:
+                if article.get(field):
+                    paper[field] = str(article[field])
+            if article.get("link"):
+                paper["url"] = article["link"][0]["url"]
+            metadata[paper["paper_id"]] = paper
+
+    return metadata
+
+
 class DocumentTopicFactory:
     """A factory to create document-topic mapping."""
 
@@ -0,0 +1,155 @@
+import logging
+from collections import Counter, defaultdict
+
+import click
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from askem.blacklist import get_blacklist, save_blacklist
+from askem.blacklist import mine_blacklist as mine_blacklist_terms
+from askem.retriever.base import (
+    PAPER_TERMS_PROPERTY,
+    PARAGRAPH_TERMS_PROPERTY,
+    ensure_property,
+    get_client,
+)
+from askem.retriever.data_models import TOPIC_ALIASES, to_topic
+from askem.retriever.migrate import StoredObject, iter_objects, write_object
+from askem.retriever.writer import BatchWriter
+from askem.terms_extractor import STRATEGIES, extract_paragraph_terms
+
+load_dotenv()
+
+
+def has_topic(obj: StoredObject, topic: str) -> bool:
+    """Whether an object is in a topic, also under a legacy topic name."""
+    topics = obj.properties.get("topic_list") or []
+    return any(TOPIC_ALIASES.get(t, t) == topic for t in topics)
+
+
+@click.command()
+@click.option("--topic", help="Topic of the corpus.", type=str, required=True)
+@click.option("--weaviate-url", help="Weaviate URL.", type=str)
+@click.option("--class-name", default="Paragraph", type=str)
+@click.option("--paper-class-name", default="Paper", type=str)
+@click.option(
+    "--strategy",
+    type=click.Choice(list(STRATEGIES)),
+    help="Strategy of the papers' terms and blacklist mining. Defaults to the "
+    "paragraph_terms strategies of ingest.",
+)
+@click.option("--min-length", default=3, type=int)
+@click.option("--top-k", default=10, help="Max terms per paragraph.", type=int)
+@click.option("--paper-top-k", default=20, help="Max terms per paper.", type=int)
+@click.option("--batch-size", default=1000, type=int)
+@click.option("--n-process", default=1, help="spaCy worker processes.", type=int)
+@click.option("--workers", default=2, help="Concurrent batch requests.", type=int)
+@click.option(
+    "--mine-blacklist",
+    help="Only add terms found in at least this fraction of papers to the topic's "
+    "blacklist, nothing is stored in Weaviate.",
+    type=float,
+)
+def main(
+    topic: str,
+    weaviate_url: str | None,
+    class_name: str,
+    paper_class_name: str,
+    strategy: str | None,
+    min_length: int,
+    top_k: int,
+    paper_top_k: int,
+    batch_size: int,
+    n_process: int,
+    workers: int,
+    mine_blacklist: float | None,
+) -> None:
+    """Extract key terms of a topic's corpus and store them in Weaviate.
+
+    Paragraph terms are stored in `paragraph_terms`, extracted like at ingest so the
+    retriever's `paragraph_terms` filter matches all paragraphs alike. The most
+    frequent terms across a paper's paragraphs are stored in the paper's `terms`.
+    Objects are written back whole, with their vectors and references, in batches.
+
+    Usage:
+    # Mine the topic's non-informative terms first, then extract and store terms
+    python -m askem.extract_terms --topic covid --mine-blacklist 0.2
+    python -m askem.extract_terms --topic covid
+    """
+
+    try:
+        topic = to_topic(topic).value
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--topic'")
+
+    client = get_client(url=weaviate_url)
+    writer = BatchWriter(lambda: get_client(url=weaviate_url), workers=workers)
+    if mine_blacklist is None:
+        ensure_property(client, class_name, PARAGRAPH_TERMS_PROPERTY)
+        ensure_property(client, paper_class_name, PAPER_TERMS_PROPERTY)
+
+    extractor = None
+    if strategy is not None:
+        extractor = STRATEGIES[strategy](
+            min_length=min_length,
+            min_occurrence=1,
+            top_k=top_k,
+            blacklist=get_blacklist(topic),
+        )
+
+    # Weaviate cursors don't support `where` filters, the topic is filtered here
+    paper_counts = defaultdict(Counter)
+    n_paragraphs = 0
+    for objects in tqdm(iter_objects(client, class_name, paper_class_name, batch_size)):
+        paragraphs = [obj for obj in objects if has_topic(obj, topic)]
+        n_paragraphs += len(paragraphs)
+        texts = [paragraph.properties["text_content"] for paragraph in paragraphs]
+        all_terms = extract_paragraph_terms(texts, [topic], top_k=top_k)
+
+        if extractor is not None:
+            paper_terms = extractor.extract_terms_batch(
+                texts, batch_size=256, n_process=n_process
+            )
+        else:
+            paper_terms = all_terms
+
+        for paragraph, terms in zip(paragraphs, paper_terms):
+            paper_counts[paragraph.properties["paper_id"]].update(terms or [])
+
+        if mine_blacklist is not None:
+            continue
+        for paragraph, terms in zip(paragraphs, all_terms):
+            paragraph.properties["paragraph_terms"] = terms
+            write_object(writer, paragraph, class_name, paper_class_name)
+
+    if not n_paragraphs:
+        writer.close()
+        raise click.ClickException(f"No {class_name} objects in topic {topic}.")
+
+    if mine_blacklist is not None:
+        writer.close()
+        terms = mine_blacklist_terms(paper_counts.values(), mine_blacklist)
+        save_blacklist(topic, terms)
+        return
+
+    n = 0
+    for papers in tqdm(iter_objects(client, paper_class_name, batch_size=batch_size)):
+        for paper in papers:
+            counts = paper_counts.get(paper.properties.get("paper_id"))
+            if counts is None:
+                continue
+            paper.properties["terms"] = [
+                term for term, _ in counts.most_common(paper_top_k)
+            ]
+            write_object(writer, paper, paper_class_name)
+            n += 1
+    writer.close()
+
+    if n < len(paper_counts):
+        logging.warning(
+            f"No {paper_class_name} object for {len(paper_counts) - n} papers"
+        )
+
+
+if __name__ == "__main__":
+    main()
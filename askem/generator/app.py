@@ -1,35 +1,130 @@
+import asyncio
+import copy
 import os
+import threading
 from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI
-from pydantic import BaseModel
+from batching import MicroBatcher
+from fastapi import FastAPI, HTTPException
+from metrics import Metrics
+from pydantic import BaseModel, root_validator
 from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
+from windowing import answer_batch
 
 # GPU support
 ENABLE_CUDA = os.getenv("ENABLE_CUDA") == "1"
 DEVICE = os.getenv("CUDA_CORE") if ENABLE_CUDA else "cpu"
 
+# CPU optimizations
+GENERATOR_MODEL_NAME = os.getenv(
+    "GENERATOR_MODEL_NAME", "mbialo/autotrain-test-58072133169"
+)
+# "torch" or "onnx", the image must be built with `INSTALL_ONNX=true` for "onnx"
+GENERATOR_BACKEND = os.getenv("GENERATOR_BACKEND", "torch")
+GENERATOR_QUANTIZE = os.getenv("GENERATOR_QUANTIZE") == "1"  # int8, CPU only
+
+# Micro-batching
+MAX_BATCH_SIZE = int(os.getenv("GENERATOR_MAX_BATCH_SIZE", 16))
+MAX_BATCH_WAIT = float(os.getenv("GENERATOR_MAX_BATCH_WAIT_MS", 5)) / 1000
+
+# Worker pool, inference runs off the event loop
+GENERATOR_WORKERS = int(os.getenv("GENERATOR_WORKERS", 1))
+MAX_QUEUE_SIZE = int(os.getenv("GENERATOR_MAX_QUEUE_SIZE", 256))
+
+
+def get_model(
+    model_name: str = GENERATOR_MODEL_NAME,
+    backend: str = GENERATOR_BACKEND,
+    quantize: bool = GENERATOR_QUANTIZE,
+):
+    """Load the QA model, optionally as ONNX Runtime or int8 quantized."""
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForQuestionAnswering
+        except ImportError:
+            raise ImportError(
+                "The onnx backend requires requirements-onnx.txt (INSTALL_ONNX=true)."
+            )
+
+        return ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+
+    model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+    if quantize:
+        import torch
+
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+def set_torch_threads(workers: int = GENERATOR_WORKERS) -> None:
+    """Split CPU cores between workers, so concurrent batches don't oversubscribe."""
+    import torch
+
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
 
 def get_generator(device=DEVICE):
     """Get generator pipeline from Hugging-face hosting."""
-    tokenizer = AutoTokenizer.from_pretrained("mbialo/autotrain-test-58072133169")
-    model = AutoModelForQuestionAnswering.from_pretrained(
-        "mbialo/autotrain-test-58072133169"
-    )
+    if (GENERATOR_QUANTIZE or GENERATOR_BACKEND == "onnx") and device != "cpu":
+        raise ValueError("Quantized and ONNX generators only run on CPU.")
+
+    tokenizer = AutoTokenizer.from_pretrained(GENERATOR_MODEL_NAME)
+    model = get_model()
     return pipeline(
         "question-answering", model=model, tokenizer=tokenizer, device=device
     )
 
 
+_worker = threading.local()
+
+
+def get_worker_tokenizer():
+    """Tokenizer of the current worker thread.
+
+    Fast tokenizers are not thread-safe ("Already borrowed"), so each worker gets
+    its own copy, the model is shared.
+    """
+
+    if not hasattr(_worker, "tokenizer"):
+        _worker.tokenizer = copy.deepcopy(cached_resources["generator"].tokenizer)
+    return _worker.tokenizer
+
+
+def run_batch(queries: List["Query"]) -> List[dict]:
+    """Answer many queries in one windowed pass over the model."""
+
+    return answer_batch(
+        cached_resources["generator"].model,
+        get_worker_tokenizer(),
+        [(query.question, query.get_passages()) for query in queries],
+    )
+
+
 cached_resources = {}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Cache generator before API startup."""
+    """Cache generator and start the batcher before API startup."""
+    if DEVICE == "cpu":
+        set_torch_threads()
     cached_resources["generator"] = get_generator()
+    cached_resources["batcher"] = MicroBatcher(
+        run_batch,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait=MAX_BATCH_WAIT,
+        workers=GENERATOR_WORKERS,
+        max_queue_size=MAX_QUEUE_SIZE,
+        metrics=Metrics(),
+    )
+    cached_resources["batcher"].start()
     yield
     # Release resources when app stops
+    await cached_resources["batcher"].stop()
     cached_resources["generator"] = None
 
 
@@ -37,20 +132,48 @@ app = FastAPI(lifespan=lifespan)
 
 
 # IO Models
+class Document(BaseModel):
+    """Pre-retrieved document, as returned by the retriever."""
+
+    text: str
+    paper_id: Optional[str] = None
+
+
 class Query(BaseModel):
-    """Generator query input data model."""
+    """Generator query input data model.
+
+    Either a `context` string or a list of `documents`, windows never cross
+    document boundaries.
+    """
 
-    context: str
     question: str
+    context: Optional[str] = None
+    documents: Optional[List[Document]] = None
+
+    @root_validator
+    def check_context(cls, values):
+        if (values.get("context") is None) == (values.get("documents") is None):
+            raise ValueError("Provide exactly one of context or documents.")
+        return values
+
+    def get_passages(self) -> List[str]:
+        if self.documents is not None:
+            return [document.text for document in self.documents]
+        return [self.context]
 
 
 class Answer(BaseModel):
-    """Generator answer output data model."""
+    """Generator answer output data model.
+
+    `start` and `end` are character offsets into the context, or into the text of
+    `documents[document]` when documents were given.
+    """
 
     answer: str
     start: int
     end: int
     score: float
+    document: Optional[int] = None
 
 
 @app.get("/")
@@ -59,12 +182,50 @@ async def get_root():
     return {"ping": "pong!"}
 
 
+@app.get("/metrics")
+async def get_metrics() -> dict:
+    """Throughput, latency, batch size and queue depth metrics."""
+    return cached_resources["batcher"].snapshot()
+
+
+async def submit(queries: List[Query]) -> List[dict]:
+    """Queue queries for batched inference, 429 if the generator is saturated."""
+    try:
+        return await cached_resources["batcher"].submit_many(queries)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Generator queue is full, retry later.",
+            headers={"Retry-After": "1"},
+        )
+
+
+def to_answer(query: Query, answer: dict) -> Answer:
+    """Convert a windowed answer, keeping the document index only for documents."""
+    passage = answer.pop("passage")
+    document = passage if query.documents is not None else None
+    return Answer(**answer, document=document)
+
+
 # POST endpoint for query
 @app.post("/")
 async def get_answer(query: Query) -> Answer:
     """Generate answer for a given question and context."""
-    answer = cached_resources["generator"](
-        question=query.question, context=query.context
-    )
-    print(answer.keys())
-    return Answer(**answer)
+    (answer,) = await submit([query])
+    return to_answer(query, answer)
+
+
+@app.post("/batch")
+async def get_answers(queries: List[Query]) -> List[Answer]:
+    """Generate answers for many question and context pairs.
+
+    Batches larger than the generator queue can never be queued, they are rejected
+    with 413 rather than 429 so clients split them instead of retrying.
+    """
+    if MAX_QUEUE_SIZE and len(queries) > MAX_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the generator queue size {MAX_QUEUE_SIZE}.",
+        )
+    answers = await submit(queries)
+    return [to_answer(query, answer) for query, answer in zip(queries, answers)]
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from metrics import Metrics
+
+
+class MicroBatcher:
+    """Collect concurrent requests for a few milliseconds and run them as one batch.
+
+    Batches run on a bounded thread pool so the event loop stays responsive, torch
+    releases the GIL during inference.
+
+    Args:
+        fn: Batch function, maps a list of inputs to a list of outputs in the same order.
+        max_batch_size: Max number of inputs per batch.
+        max_wait: Max seconds to wait for more inputs after the first one arrives.
+        workers: Max number of batches running concurrently.
+        max_queue_size: Max number of queued inputs, `asyncio.QueueFull` is raised
+            beyond it, and `ValueError` for more inputs at once, which never fit.
+            0 means unbounded.
+        metrics: Metrics recorder.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        workers: int = 1,
+        max_queue_size: int = 0,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.in_flight = 0
+        self._executor = None
+        self._slots = None
+        self._task = None
+        self._batches = set()
+
+    def start(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="generator"
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._batches, return_exceptions=True)
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)  # Running batches were awaited above
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        """Metrics summary, with the current queue depth and running batches."""
+        return {
+            **self.metrics.snapshot(),
+            "queue_depth": self.queue.qsize(),
+            "max_queue_size": self.queue.maxsize,
+            "in_flight_batches": self.in_flight,
+            "workers": self.workers,
+        }
+
+    def _reject_if_full(self, n: int) -> None:
+        if self.queue.maxsize and n > self.queue.maxsize:
+            self.metrics.record_rejected(n)
+            raise ValueError(f"{n} inputs exceed the queue size {self.queue.maxsize}")
+        if self.queue.maxsize and self.queue.qsize() + n > self.queue.maxsize:
+            self.metrics.record_rejected(n)
+            raise asyncio.QueueFull
+
+    async def _wait(self, future: asyncio.Future, start: float) -> Any:
+        try:
+            result = await future
+        except Exception:
+            self.metrics.record_request(time.perf_counter() - start, error=True)
+            raise
+        self.metrics.record_request(time.perf_counter() - start)
+        return result
+
+    def _enqueue(self, item: Any) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return future
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its output.
+
+        Raises:
+            asyncio.QueueFull: The queue is full.
+        """
+
+        self._reject_if_full(1)
+        return await self._wait(self._enqueue(item), time.perf_counter())
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        """Queue many inputs, they may be split across batches.
+
+        Raises:
+            asyncio.QueueFull: The queue cannot take all inputs now, none is queued.
+            ValueError: There are more inputs than `max_queue_size`.
+        """
+
+        self._reject_if_full(len(items))
+        start = time.perf_counter()
+        futures = [self._enqueue(item) for item in items]
+        return await asyncio.gather(*[self._wait(f, start) for f in futures])
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Wait for one input, then gather more until full or `max_wait` elapsed."""
+
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self._executor, self.fn, items)
+        except Exception as e:
+            logging.exception("Batch inference failed")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self.metrics.record_batch(len(batch), time.perf_counter() - start)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for a free worker first, so inputs keep batching up meanwhile
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
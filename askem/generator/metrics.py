@@ -0,0 +1,60 @@
+import time
+from collections import deque
+from typing import List, Optional
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Metrics:
+    """Throughput and latency metrics of the generator."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self.started_at = time.time()
+        self.n_requests = 0
+        self.n_batches = 0
+        self.n_errors = 0
+        self.n_rejected = 0
+        self.latencies = deque(maxlen=window)  # seconds, per request
+        self.batch_sizes = deque(maxlen=window)
+        self.inference_times = deque(maxlen=window)  # seconds, per batch
+
+    def record_batch(self, size: int, inference_time: float) -> None:
+        self.n_batches += 1
+        self.batch_sizes.append(size)
+        self.inference_times.append(inference_time)
+
+    def record_request(self, latency: float, error: bool = False) -> None:
+        self.n_requests += 1
+        self.n_errors += int(error)
+        self.latencies.append(latency)
+
+    def record_rejected(self, n: int = 1) -> None:
+        self.n_rejected += n
+
+    def snapshot(self) -> dict:
+        """Summary of the recorded metrics."""
+
+        uptime = time.time() - self.started_at
+        latencies = list(self.latencies)
+        batch_sizes = list(self.batch_sizes)
+        return {
+            "uptime": uptime,
+            "requests": self.n_requests,
+            "errors": self.n_errors,
+            "rejected": self.n_rejected,
+            "batches": self.n_batches,
+            "throughput": self.n_requests / uptime if uptime else 0.0,
+            "mean_batch_size": sum(batch_sizes) / len(batch_sizes)
+            if batch_sizes
+            else None,
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+            "latency_p99": percentile(latencies, 0.99),
+            "inference_p50": percentile(list(self.inference_times), 0.5),
+        }
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import torch
+
+MAX_SEQ_LEN = int(os.getenv("GENERATOR_MAX_SEQ_LEN", 384))
+DOC_STRIDE = int(os.getenv("GENERATOR_DOC_STRIDE", 128))
+MAX_QUESTION_LEN = 64
+MAX_ANSWER_LEN = int(os.getenv("GENERATOR_MAX_ANSWER_LEN", 30))
+WINDOW_BATCH_SIZE = 32  # windows per forward pass
+
+
+class TokenCache:
+    """Thread-safe LRU cache of tokenized texts, keyed by text hash."""
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, tokenizer, text: str) -> Tuple[List[int], List[Tuple[int, int]]]:
+        """Get token ids and character offsets of a text, without special tokens."""
+
+        key = hashlib.sha256(text.encode()).digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        encoding = tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )
+        value = (encoding["input_ids"], encoding["offset_mapping"])
+
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return value
+
+
+TOKEN_CACHE = TokenCache()
+
+
+@dataclass
+class Window:
+    """A span of one passage's tokens, paired with its question."""
+
+    query: int  # Index of the query in the batch
+    passage: int  # Index of the passage in the query
+    start: int  # First passage token of the window
+    input_ids: List[int]
+    token_type_ids: List[int]
+    context_positions: List[int]  # Positions of the passage tokens in `input_ids`
+
+
+def get_windows(
+    tokenizer,
+    question_ids: List[int],
+    passage_ids: List[int],
+    max_seq_len: int = MAX_SEQ_LEN,
+    doc_stride: int = DOC_STRIDE,
+) -> List[Tuple[int, int]]:
+    """Split passage tokens into overlapping (start, end) windows.
+
+    Each window fits `max_seq_len` along with the question and special tokens, and
+    consecutive windows overlap by `doc_stride` tokens.
+    """
+
+    window_len = max_seq_len - len(question_ids)
+    window_len -= tokenizer.num_special_tokens_to_add(pair=True)
+    if window_len <= 0:
+        raise ValueError("max_seq_len is too short for the question.")
+    step = window_len - min(doc_stride, window_len // 2)
+
+    windows = []
+    for start in range(0, max(len(passage_ids), 1), step):
+        end = min(start + window_len, len(passage_ids))
+        windows.append((start, end))
+        if end >= len(passage_ids):
+            break
+    return windows
+
+
+def make_window(tokenizer, question_ids, window_ids, **kwargs) -> Window:
+    """Build model inputs of a (question, window) pair."""
+
+    input_ids = tokenizer.build_inputs_with_special_tokens(question_ids, window_ids)
+    token_type_ids = tokenizer.create_token_type_ids_from_sequences(
+        question_ids, window_ids
+    )
+
+    # Locate the window tokens among the special tokens with placeholder ids
+    placeholders = tokenizer.build_inputs_with_special_tokens(
+        [-1] * len(question_ids), [-2] * len(window_ids)
+    )
+    context_positions = [i for i, token in enumerate(placeholders) if token == -2]
+    return Window(
+        input_ids=input_ids,
+        token_type_ids=token_type_ids,
+        context_positions=context_positions,
+        **kwargs,
+    )
+
+
+def best_span(
+    start_logits: torch.Tensor, end_logits: torch.Tensor, max_answer_len: int
+) -> Tuple[int, int, float]:
+    """Most probable (start, end, score) span over context tokens, end inclusive."""
+
+    start_probs = start_logits.softmax(-1)
+    end_probs = end_logits.softmax(-1)
+    scores = start_probs[:, None] * end_probs[None, :]
+    scores = scores.triu().tril(max_answer_len - 1)  # start <= end < start + max_len
+    index = int(scores.argmax())
+    start, end = divmod(index, scores.shape[1])
+    return start, end, float(scores[start, end])
+
+
+@torch.inference_mode()
+def forward(model, tokenizer, windows: List[Window]) -> List[Tuple[int, int, float]]:
+    """Score the best span of every window, in chunks of `WINDOW_BATCH_SIZE`."""
+
+    spans = []
+    use_token_type_ids = "token_type_ids" in tokenizer.model_input_names
+    for i in range(0, len(windows), WINDOW_BATCH_SIZE):
+        chunk = windows[i : i + WINDOW_BATCH_SIZE]
+        length = max(len(w.input_ids) for w in chunk)
+
+        def pad(values, fill):
+            return torch.tensor([v + [fill] * (length - len(v)) for v in values])
+
+        inputs = {
+            "input_ids": pad([w.input_ids for w in chunk], tokenizer.pad_token_id),
+            "attention_mask": pad([[1] * len(w.input_ids) for w in chunk], 0),
+        }
+        if use_token_type_ids:
+            inputs["token_type_ids"] = pad([w.token_type_ids for w in chunk], 0)
+        inputs = {k: v.to(model.device) for k, v in inputs.items()}
+
+        outputs = model(**inputs)
+        for j, window in enumerate(chunk):
+            if not window.context_positions:  # Empty passage
+                spans.append((0, 0, 0.0))
+                continue
+            positions = torch.tensor(window.context_positions, device=model.device)
+            spans.append(
+                best_span(
+                    outputs.start_logits[j, positions],
+                    outputs.end_logits[j, positions],
+                    MAX_ANSWER_LEN,
+                )
+            )
+    return spans
+
+
+def answer_batch(
+    model,
+    tokenizer,
+    batch: List[Tuple[str, List[str]]],
+    max_seq_len: int = MAX_SEQ_LEN,
+    doc_stride: int = DOC_STRIDE,
+    cache: TokenCache = TOKEN_CACHE,
+) -> List[dict]:
+    """Answer many questions, each over its own list of passages.
+
+    Passages are tokenized once (cached by hash) and split into overlapping windows
+    that never cross passage boundaries. All windows of the batch run together, and
+    the best scoring span across a question's windows is its answer.
+
+    Args:
+        batch: (question, passages) pairs.
+
+    Returns:
+        One answer per question, with `start` and `end` character offsets into the
+        passage at index `passage`.
+    """
+
+    windows = []
+    encoded = []
+    for i, (question, passages) in enumerate(batch):
+        question_ids = cache.encode(tokenizer, question)[0][:MAX_QUESTION_LEN]
+        encoded.append([cache.encode(tokenizer, passage) for passage in passages])
+
+        for j, (passage_ids, _) in enumerate(encoded[i]):
+            for start, end in get_windows(
+                tokenizer, question_ids, passage_ids, max_seq_len, doc_stride
+            ):
+                windows.append(
+                    make_window(
+                        tokenizer,
+                        question_ids,
+                        passage_ids[start:end],
+                        query=i,
+                        passage=j,
+                        start=start,
+                    )
+                )
+
+    answers = [
+        {"answer": "", "start": 0, "end": 0, "score": 0.0, "passage": None}
+        for _ in batch
+    ]
+    for window, (start, end, score) in zip(
+        windows, forward(model, tokenizer, windows)
+    ):
+        if score <= answers[window.query]["score"]:
+            continue
+
+        _, offsets = encoded[window.query][window.passage]
+        char_start = offsets[window.start + start][0]
+        char_end = offsets[window.start + end][1]
+        passage = batch[window.query][1][window.passage]
+        answers[window.query] = {
+            "answer": passage[char_start:char_end],
+            "start": char_start,
+            "end": char_end,
+            "score": score,
+            "passage": window.passage,
+        }
+    return answers
@@ -7,14 +7,24 @@ from functools import lru_cache
 from itertools import chain
 from multiprocessing import Pool
 from pathlib import Path
+from uuid import uuid4
 
 import slack_sdk
 import weaviate
 from dotenv import load_dotenv
 from tqdm.contrib.slack import tqdm
+from weaviate.util import generate_uuid5
 
-from askem.elastic import DocumentTopicFactory, get_text
+from askem.elastic import DocumentTopicFactory, get_article_metadata, get_text
 from askem.preprocessing import HaystackPreprocessor
+from askem.retriever.base import (
+    PARAGRAPH_TERMS_PROPERTY,
+    ensure_property,
+    get_class_names,
+    get_client,
+    get_topic_class_name,
+)
+from askem.retriever.writer import BatchWriter
 from askem.utils import get_ingested_ids
 
 logging.basicConfig(
@@ -122,9 +132,15 @@ class WeaviateIngester:
         class_name: str,
         id2topics: dict[str, list[str]],
         ingested: set[str],
+        paper_class_name: str = "Paper",
+        shard_by_topic: bool = False,
+        writer: BatchWriter | None = None,
     ) -> None:
         self.client = client
+        self.writer = writer or BatchWriter(get_client)
         self.class_name = class_name
+        self.paper_class_name = paper_class_name
+        self.shard_by_topic = shard_by_topic
         self.id2topics = id2topics
         self.ingested = ingested
 
@@ -135,6 +151,13 @@ class WeaviateIngester:
         # Make sure no files are left in the ingest folder
         self.purge_ingest_folder()
 
+        # Classes created before `paragraph_terms` get it with its field tokenization
+        for name in get_class_names(
+            class_name=class_name, shard_by_topic=shard_by_topic
+        ):
+            if client.schema.exists(name):
+                ensure_property(client, name, PARAGRAPH_TERMS_PROPERTY)
+
     @property
     def awaiting_ingest_ids(self) -> list[str]:
         """Get all ids that have not been ingested yet."""
@@ -145,6 +168,20 @@ class WeaviateIngester:
         """Get all files that have not been ingested yet."""
         return sorted(self.ingest_folder.glob("*.txt"))
 
+    def get_class_names(self, doc: dict) -> list[str]:
+        """Classes storing a paragraph, one per topic when sharded by topic."""
+
+        if not self.shard_by_topic:
+            return [self.class_name]
+
+        class_names = []
+        for topic in doc["topic_list"]:
+            try:
+                class_names.append(get_topic_class_name(self.class_name, topic))
+            except ValueError as e:
+                logging.error(f"docid: {doc['paper_id']}, Error: {e}")
+        return class_names
+
     def ingest_all(self, batch_size: int) -> None:
         """Ingest all documents to weaviate."""
         progress_bar = tqdm(total=len(self.awaiting_ingest_ids))
@@ -162,11 +199,39 @@ class WeaviateIngester:
             paragraphs = p.map(process_file, self.files_to_ingest)
         paragraphs = list(chain(*paragraphs))  # Flatten
 
-        # Push docs to weaviate
-        self.client.batch.configure(batch_size=64, dynamic=True)
-        with self.client.batch as batch:
-            for doc in paragraphs:
-                batch.add_data_object(data_object=doc, class_name=self.class_name)
+        # Bibliographic metadata of the batch, stored once per paper
+        try:
+            papers = get_article_metadata(docids)
+        except Exception as e:
+            logging.error(f"docids: {docids}, Error: metadata {e}")
+            papers = {}
+
+        # Push docs to weaviate, failed objects end up in the writer's failure log
+        for paper_id, paper in papers.items():
+            self.writer.add_object(
+                data_object=paper,
+                class_name=self.paper_class_name,
+                uuid=generate_uuid5(paper_id, self.paper_class_name),
+            )
+
+        for doc in paragraphs:
+            # Topic copies share the uuid, so topic fan-out queries merge them
+            uuid = str(uuid4())
+            for class_name in self.get_class_names(doc):
+                self.writer.add_object(
+                    data_object=doc, class_name=class_name, uuid=uuid
+                )
+                if doc["paper_id"] in papers:
+                    self.writer.add_reference(
+                        from_object_uuid=uuid,
+                        from_object_class_name=class_name,
+                        from_property_name="paper",
+                        to_object_uuid=generate_uuid5(
+                            doc["paper_id"], self.paper_class_name
+                        ),
+                        to_object_class_name=self.paper_class_name,
+                    )
+        self.writer.join()
 
         self.purge_ingest_folder()
         self.ingested.update(docids)
@@ -211,6 +276,19 @@ def main():
         action="store_true",
         help="Ingest by resuming from tmp/id2topics.pkl.",
     )
+    parser.add_argument(
+        "--shard-by-topic",
+        action="store_true",
+        help="Store paragraphs in one class per topic, see `askem.shard_topics`.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=2, help="Concurrent batch requests."
+    )
+    parser.add_argument(
+        "--max-vector-queue",
+        type=int,
+        help="Pause while more objects wait for vector indexing (async indexing).",
+    )
     args = parser.parse_args()
 
     CLASS_NAME = "Paragraph"
@@ -242,16 +320,28 @@ def main():
     id2topics = {k: v for k, v in id2topics.items() if k not in empty_ids}
 
     # A set of ingested doc_ids from the current weaviate database
-    ingested = get_ingested_ids(client=client, class_name=CLASS_NAME)
+    ingested = set()
+    for class_name in get_class_names(
+        class_name=CLASS_NAME, shard_by_topic=args.shard_by_topic
+    ):
+        ingested.update(get_ingested_ids(client=client, class_name=class_name))
 
     ingester = WeaviateIngester(
         client=client,
         class_name=CLASS_NAME,
         id2topics=id2topics,
         ingested=ingested,
+        shard_by_topic=args.shard_by_topic,
+        writer=BatchWriter(
+            get_client,
+            workers=args.workers,
+            max_vector_queue=args.max_vector_queue,
+            failure_log="tmp/failed_objects.jsonl",
+        ),
     )
 
-    ingester.ingest_all(batch_size=32)
+    with ingester.writer:
+        ingester.ingest_all(batch_size=32)
 
     # Post ingest
     update_empty_ids_file(
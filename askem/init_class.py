@@ -4,31 +4,124 @@ from typing import Optional
 import click
 from dotenv import load_dotenv
 
-from askem.retriever.base import get_client, init_retriever
+from askem.retriever.base import (
+    COMPRESSIONS,
+    INDEX_PROFILES,
+    get_class_names,
+    get_client,
+    get_supported_profiles,
+    get_vector_index_config,
+    get_versioned_class_name,
+    init_retriever,
+)
 
 load_dotenv()
 
+MUTABLE = {"ef", *COMPRESSIONS}
+
 
 @click.command()
 @click.option("--weaviate-url", help="Weaviate URL.", type=str)
 @click.option("--version", help="Schema version", type=int, required=False)
-def main(weaviate_url: str = None, version: Optional[int] = None) -> None:
+@click.option("--class-name", default="Paragraph", type=str)
+@click.option(
+    "--index-profile",
+    help="HNSW index profile.",
+    type=click.Choice(list(INDEX_PROFILES)),
+    default="default",
+)
+@click.option("--ef", help="Query time candidate list size.", type=int)
+@click.option("--ef-construction", help="Build time candidate list size.", type=int)
+@click.option("--max-connections", help="Graph edges per node.", type=int)
+@click.option("--shard-count", type=int)
+@click.option("--replication-factor", type=int)
+@click.option(
+    "--shard-by-topic",
+    is_flag=True,
+    help="One class per topic, e.g. `Paragraph_v3_xdd_covid_19`.",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Apply the mutable settings (ef, compression) of the profile to an "
+    "existing class instead of creating it.",
+)
+def main(
+    weaviate_url: str = None,
+    version: Optional[int] = None,
+    class_name: str = "Paragraph",
+    index_profile: str = "default",
+    ef: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    max_connections: Optional[int] = None,
+    shard_count: Optional[int] = None,
+    replication_factor: Optional[int] = None,
+    shard_by_topic: bool = False,
+    update: bool = False,
+) -> None:
     """Initialize the retriever data structure in weaviate.
 
     Usage:
     # init latest version schema
     python -m askem.init_class --weaviate-url http://url:8080
 
-    # init specific version schema
+    # init specific version schema, i.e. `Paragraph_v2`
     python -m askem.init_class --weaviate-url http://url:8080 --version 2
 
+    # init with 2 shards
+    python -m askem.init_class --shard-count 2
+
+    # init a version sharded by topic, i.e. `Paragraph_v3_<topic>` served as
+    # `Paragraph` by `switch_class --shard-by-topic`
+    python -m askem.init_class --version 3 --shard-by-topic
+
+    # compress (once ingested) and tune a live class, see `scripts/bench_hnsw.py`
+    python -m askem.init_class --index-profile pq --ef 96 --update
+
     """
 
-    if not version:
-        version = os.getenv("WEAVIATE_SCHEMA_VERSION")
+    if not version and os.getenv("WEAVIATE_SCHEMA_VERSION"):
+        version = int(os.getenv("WEAVIATE_SCHEMA_VERSION"))
 
     client = get_client(url=weaviate_url)
-    init_retriever(client=client, version=version)
+    server_version = client.get_meta()["version"]
+    if index_profile not in get_supported_profiles(server_version):
+        raise click.UsageError(
+            f"{index_profile} is not supported by weaviate {server_version}."
+        )
+
+    vector_index_config = get_vector_index_config(
+        index_profile,
+        ef=ef,
+        ef_construction=ef_construction,
+        max_connections=max_connections,
+    )
+
+    if update:
+        # Graph settings and distance are fixed at creation
+        config = {k: v for k, v in vector_index_config.items() if k in MUTABLE}
+        for name in get_class_names(
+            class_name=get_versioned_class_name(class_name, version),
+            shard_by_topic=shard_by_topic,
+        ):
+            client.schema.update_config(name, {"vectorIndexConfig": config})
+        return
+
+    if any(k in vector_index_config for k in COMPRESSIONS):
+        raise click.UsageError(
+            f"{index_profile} is trained on imported vectors, create the class "
+            "without it and apply it with --update once ingested."
+        )
+
+    init_retriever(
+        client=client,
+        version=version,
+        class_name=class_name,
+        shard_by_topic=shard_by_topic,
+        vector_index_config=vector_index_config,
+        shard_count=shard_count,
+        replication_factor=replication_factor,
+    )
 
 
 if __name__ == "__main__":
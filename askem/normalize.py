@@ -0,0 +1,111 @@
+"""Text normalization kernels shared by `preprocessing` and `terms_extractor`.
+
+ASCII punctuation is deleted with `bytes.translate` on the UTF-8 encoding (multi-byte
+characters never contain ASCII bytes). Non-ASCII characters are only visited as
+regex matched runs, through translation tables caching each codepoint's mapping.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable
+
+CITATION_PATTERN = re.compile(r"\((?:[A-Za-z‐\s]+(?:et al\.)?, \d{4}(?:; )?)+\)")
+NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]+")
+
+
+class _CodepointTable(dict):
+    """`str.translate` table filled on first use of each codepoint."""
+
+    def __init__(self, mapping: Callable[[str], str]) -> None:
+        super().__init__()
+        self.mapping = mapping
+
+    def __missing__(self, codepoint: int) -> str:
+        self[codepoint] = self.mapping(chr(codepoint))
+        return self[codepoint]
+
+
+def _strip_combining(char: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", char)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+DIACRITICS_TABLE = _CodepointTable(_strip_combining)
+
+
+def _is_kept(char: str, exceptions: str) -> bool:
+    return char.isalnum() or char.isspace() or char in exceptions
+
+
+@lru_cache
+def get_ascii_punctuation(exceptions: str = "") -> bytes:
+    """ASCII bytes to delete, i.e. not alphanumeric, whitespace or `exceptions`."""
+    return bytes(i for i in range(128) if not _is_kept(chr(i), exceptions))
+
+
+@lru_cache
+def get_punctuation_table(exceptions: str = "") -> _CodepointTable:
+    """Translation table deleting non-ASCII punctuation."""
+    return _CodepointTable(lambda c: c if _is_kept(c, exceptions) else "")
+
+
+def _translate_non_ascii(text: str, table: _CodepointTable) -> str:
+    return NON_ASCII_PATTERN.sub(lambda match: match.group().translate(table), text)
+
+
+def remove_line_breaks(text: str) -> str:
+    return text.replace("\n", " ")
+
+
+def remove_punctuations(text: str, exceptions: str | list | None = None) -> str:
+    """Keep alphanumeric, whitespace and `exceptions` characters."""
+    exceptions = "".join(exceptions) if exceptions else ""
+    encoded = text.encode("utf-8", "surrogatepass")
+    encoded = encoded.translate(None, get_ascii_punctuation(exceptions))
+    text = encoded.decode("utf-8", "surrogatepass")
+    if text.isascii():
+        return text
+    return _translate_non_ascii(text, get_punctuation_table(exceptions))
+
+
+def remove_diacritics(text: str) -> str:
+    if text.isascii():  # ASCII is NFKD invariant
+        return text
+    return _translate_non_ascii(text, DIACRITICS_TABLE)
+
+
+def remove_brackets(text: str) -> str:
+    return text.replace("(", " ").replace(")", " ")
+
+
+def remove_citations(text: str) -> str:
+    """Remove in-text citations, e.g. `(Smith et al., 2020; Doe, 2021)`."""
+    if "(" not in text:
+        return text
+    return CITATION_PATTERN.sub("", text)
+
+
+def normalize(
+    text: str,
+    line_breaks: bool = True,
+    diacritics: bool = True,
+    citations: bool = True,
+    punctuation: bool = True,
+    exceptions: str | list | None = None,
+) -> str:
+    """Fused normalization pipeline.
+
+    Steps run in this order: line breaks to spaces, diacritics removal, citations
+    removal, punctuation removal (keeping `exceptions`).
+    """
+
+    if line_breaks:
+        text = remove_line_breaks(text)
+    if diacritics:
+        text = remove_diacritics(text)
+    if citations:
+        text = remove_citations(text)
+    if punctuation:
+        text = remove_punctuations(text, exceptions)
+    return text
@@ -1,16 +1,20 @@
 import logging
 import re
-import unicodedata
 from copy import deepcopy
 from pathlib import Path
 from typing import List, Optional, Protocol, Tuple, Union
 import hashlib
+import heapq
+from collections import Counter
 from haystack import Pipeline
 from haystack.errors import HaystackError
 from haystack.nodes import PreProcessor, TextConverter
 from haystack.schema import Document
 
+from askem.normalize import normalize
 from askem.retriever.data_models import DocType, Topic
+from askem.retriever.dedup import get_minhash
+from askem.terms_extractor import extract_paragraph_terms
 
 MAX_WORDS = 250
 MIN_WORDS = 100
@@ -38,38 +42,24 @@ def update_count(d: dict, words: Optional[List[str]]) -> None:
 def get_top_k(d: dict, k: int = 10, min_occurrences: int = 1) -> dict:
     """Get top-k most frequent words in a dictionary."""
 
-    d = {k: v for k, v in d.items() if v >= min_occurrences}
-    return sorted(d, key=d.get, reverse=True)[:k]
-
-
-def strip_punctuation(text: str) -> str:
-    return "".join([c for c in text if c.isalnum() or c.isspace()])
-
-
-def remove_diacritics(text: str) -> str:
-    nfkd_form = unicodedata.normalize("NFKD", text)
-    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    items = ((word, n) for word, n in d.items() if n >= min_occurrences)
+    return [word for word, _ in heapq.nlargest(k, items, key=lambda item: item[1])]
 
 
 def get_all_cap_words(text: str, min_length: int = 3, top_k: int = 3) -> list:
     """Get capitalized words in a text, sorted by number of occurrence."""
 
-    text = strip_punctuation(text)
-    text = remove_diacritics(text)
+    text = normalize(text, line_breaks=False, citations=False)
 
-    words = text.split()
-    all_cap_words = [
-        word for word in words if word.isupper() and len(word) >= min_length
-    ]
+    counts = Counter(
+        word for word in text.split() if word.isupper() and len(word) >= min_length
+    )
 
-    if not all_cap_words:
+    if not counts:
         return None
 
-    # Count the number of all caps words
-    counts = {word: text.count(word) for word in all_cap_words}
-
     # Return top-k most frequent all caps words
-    return sorted(counts, key=counts.get, reverse=True)[:top_k]
+    return get_top_k(counts, k=top_k)
 
 
 class ModifiedPreProcessor(PreProcessor):
@@ -407,8 +397,9 @@ class HaystackPreprocessor:
         outputs = []
         contents = [d.content for d in results["documents"]]
         adjusted_contents = adjust_paragraphs(contents)
+        all_terms = extract_paragraph_terms(adjusted_contents, topics)
 
-        for i, content in enumerate(adjusted_contents):
+        for i, (content, terms) in enumerate(zip(adjusted_contents, all_terms)):
             outputs.append(
                 {
                     "preprocessor_id": self.preprocessor_id,
@@ -417,7 +408,9 @@ class HaystackPreprocessor:
                     "topic_list": topics,
                     "text_content": content,
                     "hashed_text": get_hash(content),
-                    "paragraph_order": i
+                    "text_minhash": get_minhash(content),
+                    "paragraph_terms": terms,
+                    "paragraph_order": i,
                 }
             )
 
@@ -442,6 +435,8 @@ class HaystackPreprocessor:
                 "topic_list": topics,
                 "text_content": content,
                 "hashed_text": get_hash(content),
+                "text_minhash": get_minhash(content),
+                "paragraph_terms": extract_paragraph_terms([content], topics)[0],
             }
         )
         return outputs
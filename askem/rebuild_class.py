@@ -0,0 +1,68 @@
+import click
+from dotenv import load_dotenv
+
+from askem.retriever.base import get_class_names, get_client, init_retriever
+from askem.retriever.migrate import rebuild_class
+from askem.retriever.writer import BatchWriter
+
+load_dotenv()
+
+
+@click.command()
+@click.option("--weaviate-url", help="Weaviate URL.", type=str)
+@click.option("--class-name", default="Paragraph", help="Source class.", type=str)
+@click.option("--destination", help="Class to create.", type=str, required=True)
+@click.option("--paper-class-name", default="Paper", type=str)
+@click.option(
+    "--shard-by-topic", is_flag=True, help="Rebuild each topic class of the classes."
+)
+@click.option("--batch-size", default=1000, type=int)
+@click.option("--workers", default=2, help="Concurrent batch requests.", type=int)
+def main(
+    weaviate_url: str | None,
+    class_name: str,
+    destination: str,
+    paper_class_name: str,
+    shard_by_topic: bool,
+    batch_size: int,
+    workers: int,
+) -> None:
+    """Rebuild a class with the current schema, e.g. its filter property indexes.
+
+    The source class keeps serving while it is copied. Run again to copy objects
+    ingested meanwhile, then point the retriever to the destination class.
+
+    With `--shard-by-topic`, each topic class (e.g. `Paragraph_xdd_covid_19`) is
+    rebuilt into the destination's topic class (`Paragraph_v2_xdd_covid_19`).
+
+    Usage:
+    python -m askem.rebuild_class --class-name Paragraph --destination Paragraph_v2
+    """
+
+    client = get_client(url=weaviate_url)
+    # Existing topic classes are kept
+    if shard_by_topic or not client.schema.exists(destination):
+        init_retriever(
+            client=client,
+            class_name=destination,
+            paper_class_name=paper_class_name,
+            shard_by_topic=shard_by_topic,
+        )
+
+    for source, target in zip(
+        get_class_names(class_name=class_name, shard_by_topic=shard_by_topic),
+        get_class_names(class_name=destination, shard_by_topic=shard_by_topic),
+    ):
+        n = rebuild_class(
+            client,
+            source,
+            target,
+            paper_class_name=paper_class_name,
+            batch_size=batch_size,
+            writer=BatchWriter(lambda: get_client(url=weaviate_url), workers=workers),
+        )
+        click.echo(f"Copied {n} objects to {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+import time
+
+import weaviate
+from weaviate.util import generate_uuid5
+
+# Weaviate (< 1.32) has no class aliases, they are stored as objects of this class
+ALIAS_CLASS_NAME = "ClassAlias"
+ALIAS_TTL = float(os.getenv("WEAVIATE_ALIAS_TTL", 30))
+
+
+def get_alias_schema() -> dict:
+    """Obtain the schema of class aliases, one object per alias."""
+    return {
+        "class": ALIAS_CLASS_NAME,
+        "description": "Class read by the retriever under an alias",
+        "vectorizer": "none",
+        "properties": [
+            {"name": "alias", "dataType": ["text"], "tokenization": "field"},
+            {"name": "class_name", "dataType": ["text"], "tokenization": "field"},
+        ],
+    }
+
+
+def get_alias(client: weaviate.Client, alias: str) -> str | None:
+    """Class an alias points to, None if the alias is not set."""
+
+    if not client.schema.exists(ALIAS_CLASS_NAME):
+        return None
+    obj = client.data_object.get_by_id(
+        generate_uuid5(alias, ALIAS_CLASS_NAME), class_name=ALIAS_CLASS_NAME
+    )
+    return obj["properties"]["class_name"] if obj else None
+
+
+def set_alias(client: weaviate.Client, alias: str, class_name: str) -> None:
+    """Point an alias to a class, readers switch on their next resolution."""
+
+    if not client.schema.exists(ALIAS_CLASS_NAME):
+        client.schema.create_class(get_alias_schema())
+
+    # A single object write, readers never see a partial switch
+    data_object = {"alias": alias, "class_name": class_name}
+    uuid = generate_uuid5(alias, ALIAS_CLASS_NAME)
+    if get_alias(client, alias) is None:
+        client.data_object.create(data_object, ALIAS_CLASS_NAME, uuid=uuid)
+    else:
+        client.data_object.replace(data_object, ALIAS_CLASS_NAME, uuid=uuid)
+    logging.info(f"Alias {alias} points to {class_name}")
+
+
+class AliasResolver:
+    """Resolve class aliases, cached for `ttl` seconds.
+
+    A name without alias resolves to itself, so a plain class name keeps working.
+    When Weaviate can't be reached, the last resolved class is kept.
+    """
+
+    def __init__(self, ttl: float = ALIAS_TTL) -> None:
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, client: weaviate.Client, name: str) -> str:
+        with self._lock:
+            class_name, expiry = self._cache.get(name, (None, 0.0))
+        if time.monotonic() < expiry:
+            return class_name
+
+        try:
+            class_name = get_alias(client, name) or name
+        except Exception as e:
+            logging.warning(f"Failed to resolve alias {name}: {e}")
+            class_name = class_name or name
+
+        with self._lock:
+            self._cache[name] = (class_name, time.monotonic() + self.ttl)
+        return class_name
+
+
+ALIAS_RESOLVER = AliasResolver()
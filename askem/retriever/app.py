@@ -1,84 +1,191 @@
-import json
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
+import orjson
 from auth import has_valid_api_key
-from data_models import BaseQuery, Document, HybridQuery, ReactQuery
-from engine import ReactManager, hybrid_search, react_search, vector_search
-from fastapi import Depends, FastAPI
-from fastapi.responses import StreamingResponse
+from data_models import BaseQuery, Document, HybridQuery, PageQuery, ReactQuery
+from engine import hybrid_search, is_ready, vector_search
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pagination import get_search_config, iter_pages
+from rerank import preload as preload_reranker
 
 logging.basicConfig(level=logging.DEBUG)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the optional reranker, without blocking startup."""
+    preload_reranker()
+    yield
+
+
 app = FastAPI(
     title="ASK-xDD API",
     description="API for the ASK-xDD.",
     version="0.3.1",
+    lifespan=lifespan,
 )
 
 
+def serialize(
+    document: Document, fields: list[str] | None = None, exclude_none: bool = False
+) -> dict:
+    """Serialize a `Document`, optionally keeping only `fields`."""
+    include = set(fields) if fields else None
+    return document.model_dump(include=include, exclude_none=exclude_none)
+
+
+def to_response(
+    documents: list[Document], fields: list[str] | None = None
+) -> ORJSONResponse:
+    """Serialize documents with orjson, skipping FastAPI response re-validation."""
+    return ORJSONResponse([serialize(doc, fields) for doc in documents])
+
+
 @app.get("/")
 async def get_root():
     """Health check."""
     return {"ping": "pong!"}
 
 
-@app.post("/vector", dependencies=[Depends(has_valid_api_key)])
-async def vector(query: BaseQuery) -> list[Document]:
+@app.get("/ready")
+async def get_ready():
+    """Readiness probe, connects to Weaviate on first call."""
+    if not await asyncio.to_thread(is_ready):
+        raise HTTPException(status_code=503, detail="Weaviate is not ready.")
+    return {"ready": True}
+
+
+@app.post(
+    "/vector",
+    dependencies=[Depends(has_valid_api_key)],
+    response_model=list[Document],
+)
+def vector(query: BaseQuery) -> ORJSONResponse:
     """Search relevant documents using vector search."""
 
     logging.debug(f"Accessing vector route with: {query}")
-    return vector_search(**query.model_dump(exclude_none=True))
+    documents = vector_search(**query.model_dump(exclude_none=True, exclude={"fields"}))
+    return to_response(documents, fields=query.fields)
+
+
+@app.post("/vector_pages", dependencies=[Depends(has_valid_api_key)])
+async def vector_pages(query: PageQuery) -> StreamingResponse:
+    """Stream vector search results page by page as NDJSON.
+
+    Each line is `{"documents": [...], "cursor": str | None}`, send `cursor` back to
+    resume after that page.
+    """
+
+    logging.debug(f"Accessing vector pages route with: {query}")
+    pages = iter_pages(
+        vector_search,
+        search_config=get_search_config(query),
+        page_size=query.page_size,
+        max_documents=query.top_k,
+        offset=query.offset or 0,
+        cursor=query.cursor,
+    )
+
+    def _formatted_iterator():
+        for documents, cursor in pages:
+            page = {
+                "documents": [serialize(doc, query.fields) for doc in documents],
+                "cursor": cursor,
+            }
+            yield orjson.dumps(page) + b"\n"
+
+    return StreamingResponse(_formatted_iterator(), media_type="application/x-ndjson")
 
 
-@app.post("/hybrid", dependencies=[Depends(has_valid_api_key)])
-async def hybrid(query: HybridQuery) -> list[Document]:
+@app.post(
+    "/hybrid",
+    dependencies=[Depends(has_valid_api_key)],
+    response_model=list[Document],
+)
+def hybrid(query: HybridQuery) -> ORJSONResponse:
     """Hybrid search relevant documents."""
 
     logging.debug(f"Accessing hybrid route with: {query}")
-    return hybrid_search(**query.model_dump(exclude_none=True))
+    documents = hybrid_search(**query.model_dump(exclude_none=True, exclude={"fields"}))
+    return to_response(documents, fields=query.fields)
 
 
 @app.post("/react", dependencies=[Depends(has_valid_api_key)])
 def react(query: ReactQuery) -> dict:
     """ReAct search chain."""
 
+    from react import react_search  # langchain is only loaded for ReAct
+
     logging.debug(f"Accessing react route with: {query}")
-    return react_search(**query.model_dump(exclude_none=True))
+    output = react_search(
+        **query.model_dump(exclude_none=True, exclude={"fields", "stream_tokens"})
+    )
+    output["used_docs"] = [serialize(doc, query.fields) for doc in output["used_docs"]]
+    return output
 
 
 @app.post("/react_streaming", dependencies=[Depends(has_valid_api_key)])
-async def react_streaming(query: ReactQuery) -> dict:
-    """ReAct search chain."""
+async def react_streaming(query: ReactQuery, request: Request) -> StreamingResponse:
+    """ReAct search chain, streaming events as they happen.
+
+    Responds with server-sent events when the request accepts `text/event-stream`,
+    otherwise with NDJSON (one event per line). NDJSON keeps the `thoughts`,
+    `used_docs` and `answer` events of the step iterator, unless `stream_tokens` opts
+    in to `token` events and empty lines as heartbeats.
+    """
+
+    from react import ReactManager  # langchain is only loaded for ReAct
 
     logging.debug(f"Accessing react streaming route with: {query}")
 
-    search_config = query.model_dump(exclude_none=True)
+    search_config = query.model_dump(
+        exclude_none=True, exclude={"fields", "stream_tokens"}
+    )
     question = search_config.pop("question")
     openai_model_name = search_config.pop("openai_model_name")
+    step_token_budget = search_config.pop("step_token_budget")
+    chain_token_budget = search_config.pop("chain_token_budget")
     chain = ReactManager(
         openai_model_name=openai_model_name,
         search_config=search_config,
+        step_token_budget=step_token_budget,
+        chain_token_budget=chain_token_budget,
     )
-    step_iterator = chain.get_iterator(question=question)
-
-    def _formatted_iterator():
-        for step in step_iterator:
-            if "output" in step:
-                messages = [{"answer": step["output"]}]
-
-            elif "intermediate_step" in step:
-                action_logs = step["intermediate_step"][0][0].log.split("\n")
-                messages = [{"thoughts": log} for log in action_logs if log]
-
-                # Append used documents
-                serialized_docs = [
-                    doc.model_dump(exclude_none=True) for doc in chain.latest_used_docs
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    stream_tokens = use_sse or query.stream_tokens
+
+    def _format(event: dict) -> bytes:
+        if "used_docs" in event:
+            event = {
+                "used_docs": [
+                    serialize(doc, query.fields, exclude_none=True)
+                    for doc in event["used_docs"]
                 ]
-                messages.append({"used_docs": serialized_docs})
-            else:
-                raise ValueError(f"Unknown step: {step}")
-
-            for message in messages:
-                yield json.dumps(message) + "\n"
-
-    return StreamingResponse(_formatted_iterator(), media_type="application/json")
+            }
+
+        if not use_sse:
+            return orjson.dumps(event) + b"\n" if event else b"\n"
+
+        if not event:
+            return b": heartbeat\n\n"
+        (name,) = event
+        return f"event: {name}\ndata: ".encode() + orjson.dumps(event) + b"\n\n"
+
+    async def _formatted_iterator():
+        events = chain.astream(question=question)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    logging.info("Client disconnected from react streaming")
+                    break
+                if not stream_tokens and (not event or "token" in event):
+                    continue
+                yield _format(event)
+        finally:
+            await events.aclose()
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(_formatted_iterator(), media_type=media_type)
@@ -1,11 +1,27 @@
 import logging
 import os
+import time
 
 import weaviate
-from data_models import DocType, Document, Topic
+from alias import ALIAS_RESOLVER, ALIAS_TTL
+from data_models import DocType, Document, Paper, Topic, to_doc_type, to_topic
+from dedup import collapse_duplicates
 from fastapi import HTTPException
+from rerank import rerank as rerank_results
+from weaviate.gql.get import GetBuilder
 
 WEAVIATE_CLASS_NAME = os.getenv("WEAVIATE_CLASS_NAME")
+WEAVIATE_PAPER_CLASS_NAME = os.getenv("WEAVIATE_PAPER_CLASS_NAME", "Paper")
+WEAVIATE_SHARD_BY_TOPIC = (
+    os.getenv("WEAVIATE_SHARD_BY_TOPIC", "false").lower() == "true"
+)
+PAPER_FIELDS = ["title", "author", "year", "journal", "url"]
+
+# Over-fetch factor when collapsing near-duplicates or reranking
+OVERFETCH = 4
+
+# Over-fetch factor of context paragraphs, covering duplicated paragraphs
+CONTEXT_OVERFETCH = 2
 
 
 def get_client(url: str = None, apikey: str = None) -> weaviate.Client:
@@ -21,96 +37,509 @@ def get_client(url: str = None, apikey: str = None) -> weaviate.Client:
     return weaviate.Client(url, weaviate.auth.AuthApiKey(apikey))
 
 
-def get_schema(class_name: str) -> dict:
-    """Obtain the v1 schema."""
+def get_filter_property(name: str, data_type: str = "text", **kwargs) -> dict:
+    """Property only used in exact match filters.
+
+    Text is field tokenized (one token per value, case-sensitive) into the filterable
+    (roaring bitmap) index only, without BM25 index and vectorization.
+    """
+
+    prop = {
+        "name": name,
+        "dataType": [data_type],
+        "indexFilterable": True,
+        "indexSearchable": False,
+        "moduleConfig": {"text2vec-transformers": {"skip": True}},
+        **kwargs,
+    }
+    if data_type.startswith("text"):
+        prop["tokenization"] = "field"
+    return prop
+
+
+# Extracted keywords, field tokenized for exact (case-sensitive) acronym filters
+PARAGRAPH_TERMS_PROPERTY = get_filter_property(
+    "paragraph_terms", "text[]", description="Key terms extracted from text_content"
+)
+PAPER_TERMS_PROPERTY = {
+    "name": "terms",
+    "description": "Key terms extracted from all paragraphs of the document",
+    "dataType": ["text[]"],
+    "tokenization": "field",
+}
+
+
+def ensure_property(client: weaviate.Client, class_name: str, prop: dict) -> None:
+    """Add a property to an existing class if it is missing.
+
+    Writing an unknown property lets auto-schema create it with default settings,
+    e.g. word tokenized `paragraph_terms` that no longer match acronyms exactly.
+    """
+
+    properties = client.schema.get(class_name).get("properties", [])
+    if prop["name"] not in {p["name"] for p in properties}:
+        logging.info(f"Adding {prop['name']} property to {class_name}")
+        client.schema.property.create(class_name, prop)
+
+
+def get_paper_schema(class_name: str = "Paper") -> dict:
+    """Obtain the schema of article level metadata, referenced by paragraphs."""
     return {
         "class": class_name,
-        "description": "Paragraph chunk of a document",
-        "vectorizer": "text2vec-transformers",
-        "moduleConfig": {"text2vec-transformers": {"vectorizeClassName": False}},
-        "vectorIndexConfig": {"distance": "dot"},
+        "description": "Bibliographic metadata of a document",
+        "vectorizer": "none",
         "properties": [
             {
                 "name": "paper_id",
                 "dataType": ["text"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
-            },
-            {
-                "name": "preprocessor_id",
-                "dataType": ["text"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
-            },
-            {
-                "name": "doc_type",
-                "dataType": ["text"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
-            },
-            {
-                "name": "cosmos_object_id",
-                "dataType": ["text"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
-            },
-            {
-                "name": "topic_list",
-                "dataType": ["text[]"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
+                "tokenization": "field",
+                "indexSearchable": False,
             },
+            *[{"name": field, "dataType": ["text"]} for field in PAPER_FIELDS],
+            PAPER_TERMS_PROPERTY,
+        ],
+    }
+
+
+# HNSW vector index profiles, `ef` and compression can be changed on a live class
+INDEX_PROFILES = {
+    "default": {},
+    # Higher recall, slower ingest and about twice the graph memory
+    "recall": {"ef": 256, "efConstruction": 256, "maxConnections": 64},
+    # Product quantization of the 768 dims DPR vectors into 96 one-byte segments
+    "pq": {
+        "ef": 128,
+        "pq": {"enabled": True, "segments": 96, "trainingLimit": 100000},
+    },
+    # Binary quantization, rescored from disk
+    "bq": {"ef": 128, "bq": {"enabled": True}},
+}
+
+# Quantization is trained on imported vectors, it is applied to existing classes
+# (`init_class --update`), never at creation
+COMPRESSIONS = ("pq", "bq")
+
+# Min weaviate version of a profile, docker-compose pins 1.22
+PROFILE_MIN_VERSIONS = {"bq": (1, 23)}
+
+
+def get_supported_profiles(server_version: str) -> list[str]:
+    """`INDEX_PROFILES` supported by a weaviate server version, e.g. `1.22.2`."""
+    version = tuple(int(x) for x in server_version.split(".")[:2])
+    return [
+        profile
+        for profile in INDEX_PROFILES
+        if version >= PROFILE_MIN_VERSIONS.get(profile, (0,))
+    ]
+
+
+def get_vector_index_config(
+    profile: str = "default",
+    ef: int | None = None,
+    ef_construction: int | None = None,
+    max_connections: int | None = None,
+) -> dict:
+    """HNSW `vectorIndexConfig` of an `INDEX_PROFILES` profile, with overrides."""
+
+    config = {"distance": "dot", **INDEX_PROFILES[profile]}
+    overrides = {
+        "ef": ef,
+        "efConstruction": ef_construction,
+        "maxConnections": max_connections,
+    }
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    return config
+
+
+def get_versioned_class_name(class_name: str, version: int | None = None) -> str:
+    """Class of a schema version, e.g. `Paragraph_v2` served as `Paragraph`."""
+    return class_name if version is None else f"{class_name}_v{version}"
+
+
+def get_schema(
+    class_name: str,
+    paper_class_name: str = "Paper",
+    vector_index_config: dict | None = None,
+    shard_count: int | None = None,
+    replication_factor: int | None = None,
+    version: int | None = None,
+) -> dict:
+    """Obtain the schema of a paragraph class.
+
+    Args:
+        class_name: Class name, see `get_versioned_class_name`.
+        paper_class_name: Class referenced by the `paper` property.
+        vector_index_config: HNSW settings, see `get_vector_index_config`. Defaults to None (Weaviate defaults).
+        shard_count: Number of shards. Defaults to None (One per node).
+        replication_factor: Number of replicas of each shard. Defaults to None (No replication).
+        version: Schema version, recorded in the class description. Defaults to None.
+    """
+
+    description = "Paragraph chunk of a document"
+    if version is not None:
+        description += f" (schema v{version})"
+
+    schema = {
+        "class": class_name,
+        "description": description,
+        "vectorizer": "text2vec-transformers",
+        "moduleConfig": {"text2vec-transformers": {"vectorizeClassName": False}},
+        "vectorIndexConfig": vector_index_config or get_vector_index_config(),
+        "properties": [
+            get_filter_property("paper_id"),
+            get_filter_property("preprocessor_id"),
+            get_filter_property("doc_type"),
+            get_filter_property("cosmos_object_id"),
+            get_filter_property("topic_list", "text[]"),
+            get_filter_property("paragraph_order", "int"),
+            get_filter_property(
+                "hashed_text", description="SHA256 hash of text_content"
+            ),
             {
-                "name": "paragraph_order",
-                "dataType": ["int"],
+                "name": "text_minhash",
+                "description": "MinHash signature of text_content shingles",
+                "dataType": ["int[]"],
+                "indexFilterable": False,
                 "moduleConfig": {"text2vec-transformers": {"skip": True}},
             },
+            PARAGRAPH_TERMS_PROPERTY,
             {
-                "name": "hashed_text",
-                "description": "SHA256 hash of text_content",
-                "dataType": ["text"],
-                "moduleConfig": {"text2vec-transformers": {"skip": True}},
+                "name": "paper",
+                "description": "Cross-reference to the article metadata",
+                "dataType": [paper_class_name],
             },
-            {"name": "text_content", "dataType": ["text"]},
+            # BM25 searchable only, a filterable index of every word is never used
+            {"name": "text_content", "dataType": ["text"], "indexFilterable": False},
         ],
     }
 
+    if shard_count is not None:
+        schema["shardingConfig"] = {"desiredCount": shard_count}
+    if replication_factor is not None:
+        schema["replicationConfig"] = {"factor": replication_factor}
+    return schema
+
+
+def get_topic_class_name(class_name: str, topic: Topic | str) -> str:
+    """Class holding a topic's shard of `class_name`, e.g. `Paragraph_xdd_covid_19`."""
+    return f"{class_name}_{to_topic(topic).value.replace('-', '_')}"
+
+
+def get_class_names(
+    topic: Topic | str | None = None,
+    class_name: str | None = None,
+    shard_by_topic: bool | None = None,
+) -> list[str]:
+    """Route a query on `topic` to the classes to search.
+
+    When sharded by topic, each topic has its own class (and HNSW index) and queries
+    without a topic fan out to all of them. Otherwise all topics share `class_name`.
+
+    Args:
+        topic: Topic of the query. Defaults to None (All topics).
+        class_name: Base class name. Defaults to `WEAVIATE_CLASS_NAME`.
+        shard_by_topic: Per-topic layout. Defaults to `WEAVIATE_SHARD_BY_TOPIC`.
+    """
+
+    if class_name is None:
+        class_name = WEAVIATE_CLASS_NAME
+    if shard_by_topic is None:
+        shard_by_topic = WEAVIATE_SHARD_BY_TOPIC
+
+    if not shard_by_topic:
+        return [class_name]
+    if topic is None:
+        return [get_topic_class_name(class_name, t) for t in Topic]
+    return [get_topic_class_name(class_name, topic)]
+
+
+_property_names = {}
+
+
+def get_property_names(client: weaviate.Client, class_name: str) -> set[str]:
+    """Property names of a class, cached for `ALIAS_TTL` seconds like aliases."""
+
+    names, expiry = _property_names.get(class_name, (None, 0.0))
+    if time.monotonic() < expiry:
+        return names
+
+    properties = client.schema.get(class_name).get("properties") or []
+    names = {p["name"] for p in properties}
+    _property_names[class_name] = (names, time.monotonic() + ALIAS_TTL)
+    return names
+
+
+def has_property(client: weaviate.Client, class_names: list[str], name: str) -> bool:
+    """Whether all classes have a property, classes created before it lack it."""
+    return all(name in get_property_names(client, c) for c in class_names)
+
 
 def init_retriever(
-    client: weaviate.Client | None = None, class_name: str = "Paragraph"
+    client: weaviate.Client | None = None,
+    class_name: str = "Paragraph",
+    paper_class_name: str = "Paper",
+    shard_by_topic: bool = False,
+    version: int | None = None,
+    **schema_config,
 ) -> None:
-    """Initialize the retriever."""
+    """Initialize the retriever.
+
+    With `version`, the class of that schema version (e.g. `Paragraph_v2`) is created
+    and can be built in the background, see `askem.switch_class` to serve it. With
+    `shard_by_topic`, one class per `Topic` is created instead of `class_name`,
+    existing topic classes are kept. `schema_config` (index profile, shards and
+    replicas) is passed to `get_schema`.
+    """
 
     if client is None:
         client = get_client()
 
-    schema = get_schema(class_name=class_name)
-    client.schema.create_class(schema)
+    class_name = get_versioned_class_name(class_name, version)
+    schema_config["version"] = version
+
+    # Referenced class must exist first
+    if not client.schema.exists(paper_class_name):
+        client.schema.create_class(get_paper_schema(class_name=paper_class_name))
+
+    if not shard_by_topic:
+        schema = get_schema(
+            class_name=class_name, paper_class_name=paper_class_name, **schema_config
+        )
+        client.schema.create_class(schema)
+        return
+
+    for topic_class_name in get_class_names(class_name=class_name, shard_by_topic=True):
+        if client.schema.exists(topic_class_name):
+            continue
+        logging.info(f"Creating {topic_class_name}")
+        schema = get_schema(
+            class_name=topic_class_name,
+            paper_class_name=paper_class_name,
+            **schema_config,
+        )
+        client.schema.create_class(schema)
+
+
+def run_queries(client: weaviate.Client, queries: dict[str, GetBuilder]) -> list[dict]:
+    """Run `Get` queries keyed by class name in a single request.
+
+    Returns:
+        Results of all classes, concatenated.
+    """
+
+    if len(queries) == 1:
+        results = next(iter(queries.values())).do()
+    else:
+        builders = [query.with_alias(name) for name, query in queries.items()]
+        results = client.query.multi_get(builders).do()
+
+    logging.debug(f"{results=}")
+
+    if "errors" in results:
+        raise HTTPException(status_code=500, detail=results["errors"])
+
+    data = results.get("data", {}).get("Get") or {}
+    return [result for name in queries for result in data.get(name) or []]
+
+
+def merge_results(results: list[dict]) -> list[dict]:
+    """Merge the results of several classes by distance, keeping one copy per object.
+
+    Paragraphs with several topics are copied to each topic class with the same id.
+    """
+
+    merged = []
+    seen = set()
+    for result in sorted(results, key=lambda result: result["_additional"]["distance"]):
+        if result["_additional"]["id"] not in seen:
+            seen.add(result["_additional"]["id"])
+            merged.append(result)
+    return merged
+
+
+def to_paper(reference: list[dict] | None) -> Paper | None:
+    """Convert a weaviate `paper` cross-reference to `Paper`."""
+
+    if not reference:
+        return None
+    return Paper.model_construct(**reference[0])
 
 
 def to_document(result: dict) -> Document:
-    """Convert a weaviate result to a `Document`."""
+    """Convert a weaviate result to a `Document`.
 
-    return Document(
+    Weaviate values are trusted, only `topic_list` and `doc_type` are normalized
+    before skipping pydantic validation with `model_construct`.
+    """
+
+    return Document.model_construct(
         paper_id=result["paper_id"],
         preprocessor_id=result["preprocessor_id"],
-        doc_type=result["doc_type"],
-        topic_list=result["topic_list"],
+        doc_type=to_doc_type(result["doc_type"]),
+        topic_list=[to_topic(topic) for topic in result["topic_list"]],
         cosmos_object_id=result["cosmos_object_id"],
         text_content=result["text_content"],
         hashed_text=result["hashed_text"],
-        distance=result["_additional"]["distance"],
+        paragraph_order=result.get("paragraph_order"),
+        distance=result.get("_additional", {}).get("distance"),
+        rerank_score=result.get("rerank_score"),
+        paper=to_paper(result.get("paper")),
     )
 
 
+def merge_windows(
+    documents: list[Document], context_window: int
+) -> dict[tuple[str, str], list[tuple[int, int]]]:
+    """Merge overlapping `paragraph_order` windows of documents from the same paper.
+
+    Returns:
+        Mapping of (paper_id, preprocessor_id) to sorted, non-overlapping (start, end) ranges.
+    """
+
+    windows = {}
+    for doc in documents:
+        if doc.paragraph_order is None:
+            continue
+        start = max(doc.paragraph_order - context_window, 0)
+        end = doc.paragraph_order + context_window
+        windows.setdefault((doc.paper_id, doc.preprocessor_id), []).append((start, end))
+
+    merged = {}
+    for key, ranges in windows.items():
+        ranges.sort()
+        merged[key] = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = merged[key][-1]
+            if start <= last_end + 1:
+                merged[key][-1] = (last_start, max(last_end, end))
+            else:
+                merged[key].append((start, end))
+    return merged
+
+
+def attach_context(
+    client: weaviate.Client,
+    documents: list[Document],
+    context_window: int,
+    output_fields: list[str],
+    class_names: list[str] | None = None,
+) -> None:
+    """Attach the neighboring paragraphs of each document to `Document.context`.
+
+    All windows are fetched with a single filter query on paper_id, preprocessor_id
+    and `paragraph_order` range, on each of `class_names` (`WEAVIATE_CLASS_NAME` by
+    default), paged while duplicated paragraphs crowd out neighbors.
+    """
+
+    if class_names is None:
+        class_names = [WEAVIATE_CLASS_NAME]
+
+    windows = merge_windows(documents, context_window)
+    if not windows:
+        return None
+
+    operands = []
+    n = 0
+    for (paper_id, preprocessor_id), ranges in windows.items():
+        for start, end in ranges:
+            operands.append(
+                {
+                    "operator": "And",
+                    "operands": [
+                        {
+                            "path": ["paper_id"],
+                            "operator": "Equal",
+                            "valueText": paper_id,
+                        },
+                        {
+                            "path": ["preprocessor_id"],
+                            "operator": "Equal",
+                            "valueText": preprocessor_id,
+                        },
+                        {
+                            "path": ["paragraph_order"],
+                            "operator": "GreaterThanEqual",
+                            "valueInt": start,
+                        },
+                        {
+                            "path": ["paragraph_order"],
+                            "operator": "LessThanEqual",
+                            "valueInt": end,
+                        },
+                    ],
+                }
+            )
+            n += end - start + 1
+
+    where_filter = {"operator": "Or", "operands": operands}
+
+    # Index neighbors by position. The same paragraph may be stored more than once
+    # and duplicates use up the limit, so page until every position is found or the
+    # classes run out of matches.
+    neighbors = {}
+    limit = n * CONTEXT_OVERFETCH
+    offset = 0
+    while len(neighbors) < n:
+        queries = {
+            class_name: client.query.get(class_name, output_fields)
+            .with_where(where_filter)
+            .with_limit(limit)
+            .with_offset(offset)
+            for class_name in class_names
+        }
+        results = run_queries(client, queries)
+        for result in results:
+            key = (
+                result["paper_id"],
+                result["preprocessor_id"],
+                result["paragraph_order"],
+            )
+            neighbors.setdefault(key, result)
+
+        if len(results) < limit:
+            break
+        offset += limit
+
+    logging.info(f"Retrieved {len(neighbors)} context paragraphs")
+
+    for doc in documents:
+        if doc.paragraph_order is None:
+            continue
+        doc.context = [
+            to_document(neighbors[(doc.paper_id, doc.preprocessor_id, order)])
+            for order in range(
+                doc.paragraph_order - context_window,
+                doc.paragraph_order + context_window + 1,
+            )
+            if order != doc.paragraph_order
+            and (doc.paper_id, doc.preprocessor_id, order) in neighbors
+        ]
+
+
 def get_documents(
     client: weaviate.Client,
     question: str,
     top_k: int = 5,
+    offset: int | None = None,
+    autocut: int | None = None,
     distance: float | None = None,
+    ef: int | None = None,
     topic: Topic | str | None = None,
     doc_type: DocType | str | None = None,
     preprocessor_id: str | None = None,
     paper_ids: list[str] | None = None,
+    paragraph_terms: list[str] | None = None,
     move_to: str | None = None,
     move_to_weight: float | None = 1.0,
     move_away_from: str | None = None,
     move_away_from_weight: float | None = 1.0,
+    dedup: bool = False,
+    dedup_threshold: float = 0.8,
+    max_per_paper: int | None = None,
+    context_window: int = 0,
+    rerank: bool = False,
+    rerank_budget: float | None = None,
+    include_metadata: bool = False,
 ) -> list[Document]:
     """Ask a question to retriever and return a list of relevant `Document`.
 
@@ -118,15 +547,26 @@ def get_documents(
         client: Weaviate client.
         question: Query string.
         top_k: Number of documents to return. Defaults to 5.
+        offset: Number of top documents to skip, used for pagination. Defaults to None.
+        autocut: Cut results after this number of jumps in distance. Defaults to None (No autocut).
         distance: Max distance of the document. Defaults to None.
+        ef: Min HNSW candidate list size of this query, trading latency for recall. Defaults to None (Class `ef`).
         topic: Topic filter of the document. Defaults to None (No filter).
         doc_type: Doc type filter of the document. Defaults to None (No filter).
         preprocessor_id: Preprocessor filter of the document. Defaults to None (No filter).
         paper_ids: List of paper ids to filter by. Defaults to None (No filter).
+        paragraph_terms: Only search paragraphs with any of these key terms (exact match, e.g. acronyms) extracted at ingest. Defaults to None (No filter).
         move_to: Adds an optional concept string to the query vector for more targeted results. Defaults to None, meaning no additional concept is added.
         move_to_weight: Weight of the move_to vectoring (range: 0-1). Defaults to 1.0.
         move_away_from: Adds an optional concept string to the query vector for more targeted results. Defaults to None, meaning no additional concept is added.
         move_away_from_weight: Weight of the move_away_from vectoring (range: 0-1). Defaults to 1.0.
+        dedup: Over-fetch and collapse near-duplicate paragraphs before returning `top_k`. Defaults to False.
+        dedup_threshold: Estimated Jaccard similarity above which two paragraphs are duplicates. Defaults to 0.8.
+        max_per_paper: Max number of documents per paper, only used with `dedup`. Defaults to None (No cap).
+        context_window: Number of preceding and following paragraphs attached to each document as `context`. Defaults to 0 (No context).
+        rerank: Over-fetch and reorder documents with a cross-encoder. Defaults to False.
+        rerank_budget: Reranking latency budget in seconds, the vector order is kept when exceeded. Defaults to None (No budget).
+        include_metadata: Return the article metadata (title, author, year, journal, url) as `paper`, None on classes created before the `paper` reference. Defaults to False.
     """
 
     output_fields = [
@@ -137,18 +577,30 @@ def get_documents(
         "doc_type",
         "text_content",
         "hashed_text",
+        "paragraph_order",
     ]
 
-    # ========== Build query: filtering, semantic search, limit ==========
-    results = client.query.get(WEAVIATE_CLASS_NAME, output_fields).with_additional(
-        ["distance"]
-    )
+    # ========== Build query: routing, filtering, semantic search, limit ==========
+    class_name = ALIAS_RESOLVER.resolve(client, WEAVIATE_CLASS_NAME)
+    class_names = get_class_names(topic, class_name)
+    logging.info(f"Searching {class_names}")
+
+    # Paragraphs of older classes are signed on the fly by `collapse_duplicates`
+    if dedup and has_property(client, class_names, "text_minhash"):
+        output_fields.append("text_minhash")
+
+    # Classes created before the `paper` reference return no metadata
+    if include_metadata and has_property(client, class_names, "paper"):
+        paper_fields = " ".join(PAPER_FIELDS)
+        output_fields.append(
+            f"paper {{ ... on {WEAVIATE_PAPER_CLASS_NAME} {{ {paper_fields} }} }}"
+        )
 
     # Filtering
     where_filter = {"operator": "And", "operands": []}
 
-    # by topic
-    if topic is not None:
+    # by topic, topic classes only hold their own topic
+    if topic is not None and not WEAVIATE_SHARD_BY_TOPIC:
         logging.info(f"Filtering by topic: {topic}")
         where_filter["operands"].append(
             {"path": ["topic_list"], "operator": "ContainsAny", "valueText": [topic]}
@@ -185,8 +637,22 @@ def get_documents(
             }
         )
 
-    if where_filter["operands"]:
-        results = results.with_where(where_filter)
+    # by extracted key terms, narrows the vector search candidates
+    if paragraph_terms:
+        logging.info(f"Filtering by paragraph_terms: {paragraph_terms}")
+        if not has_property(client, class_names, "paragraph_terms"):
+            raise HTTPException(
+                status_code=400,
+                detail="paragraph_terms are not extracted yet, see askem.extract_terms",
+            )
+
+        where_filter["operands"].append(
+            {
+                "path": ["paragraph_terms"],
+                "operator": "ContainsAny",
+                "valueText": paragraph_terms,
+            }
+        )
 
     # Semantic search
     near_text_query = {"concepts": [question]}
@@ -209,27 +675,60 @@ def get_documents(
             "force": move_away_from_weight,
         }
 
-    results = results.with_near_text(near_text_query)
+    # Limit results, HNSW searches max(ef, limit) candidates so a larger query limit
+    # raises the class `ef`, the extra results are dropped
+    limit = top_k * OVERFETCH if dedup or rerank else top_k
+    query_limit = max(limit, ef or 0)
+    offset = offset or 0
+
+    def build_query(class_name: str) -> GetBuilder:
+        query = (
+            client.query.get(class_name, output_fields)
+            .with_additional(["id", "distance"])
+            .with_near_text(near_text_query)
+        )
+        if where_filter["operands"]:
+            query = query.with_where(where_filter)
+        if autocut is not None:
+            query = query.with_autocut(autocut)
 
-    # Limit results and run
-    results = results.with_limit(top_k).do()
+        # Each topic class returns its own top documents, merged below
+        if len(class_names) > 1:
+            return query.with_limit(offset + query_limit)
+        query = query.with_limit(query_limit)
+        return query.with_offset(offset) if offset else query
 
-    logging.debug(f"{results=}")
+    results = run_queries(client, {name: build_query(name) for name in class_names})
 
-    # Check if errors occur
-    if "errors" in results:
-        raise HTTPException(status_code=500, detail=results["errors"])
+    if len(class_names) > 1:
+        results = merge_results(results)[offset:]
+    results = results[:limit]
 
-    if "data" not in results or not results["data"]["Get"][WEAVIATE_CLASS_NAME]:
+    if not results:
         logging.info("No results found")
-        logging.info(f"{results=}")
-        raise HTTPException(status_code=404, detail=f"No results found: {results}")
+        raise HTTPException(status_code=404, detail="No results found")
 
-    logging.info(
-        f"Retrieved {len(results['data']['Get'][WEAVIATE_CLASS_NAME])} results"
-    )
+    logging.info(f"Retrieved {len(results)} results")
+
+    # Rerank with cross-encoder
+    if rerank:
+        results = rerank_results(question, results, budget=rerank_budget)
+
+    # Collapse near-duplicates
+    if dedup:
+        results = collapse_duplicates(
+            results,
+            top_k=top_k,
+            threshold=dedup_threshold,
+            max_per_paper=max_per_paper,
+        )
+        logging.info(f"Kept {len(results)} results after collapsing duplicates")
 
     # Convert results to Document and return
-    return [
-        to_document(result) for result in results["data"]["Get"][WEAVIATE_CLASS_NAME]
-    ]
+    documents = [to_document(result) for result in results[:top_k]]
+
+    # Expand with neighboring paragraphs
+    if context_window > 0:
+        attach_context(client, documents, context_window, output_fields, class_names)
+
+    return documents
@@ -1,6 +1,6 @@
 from enum import Enum
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, root_validator, validator
 
 
 class ClassName(str, Enum):
@@ -26,18 +26,52 @@ class Topic(str, Enum):
     GEOARCHIVE = "geoarchive"
 
 
+# Lookup tables to normalize raw Weaviate values without constructing enums per call
+TOPIC_ALIASES = {
+    "covid-19": Topic.COVID,
+    "covid": Topic.COVID,
+    **{topic.value: topic for topic in Topic},
+}
+DOC_TYPES = {doc_type.value: doc_type for doc_type in DocType}
+
+
+def to_topic(topic: str) -> Topic:
+    """Normalize a topic name, including legacy aliases, to `Topic`."""
+    try:
+        return TOPIC_ALIASES[topic]
+    except KeyError:
+        raise ValueError(f"{topic=} is not a valid topic")
+
+
+def to_doc_type(doc_type: str) -> DocType:
+    """Normalize a (case insensitive) doc type name to `DocType`."""
+    try:
+        return DOC_TYPES[doc_type.lower()]
+    except KeyError:
+        raise ValueError(f"{doc_type=} is not a valid doc_type")
+
+
+# Max `ef` of a query, far below Weaviate's QUERY_MAXIMUM_RESULTS (10000)
+MAX_EF = 1024
+
+
 class BaseQuery(BaseModel):
     """Base retriever query (for vector serach)."""
 
     question: str
     top_k: int = 5
+    offset: int | None = None
+    autocut: int | None = None
     distance: float = None
+    # Min HNSW candidate list size, higher recall but slower. `ef` results are fetched
+    ef: int | None = Field(None, ge=1, le=MAX_EF)
 
     # Filters
     topic: Topic | None = None
     doc_type: DocType | None = None
     preprocessor_id: str | None = None
     paper_ids: list[str] | None = None
+    paragraph_terms: list[str] | None = None  # Exact key terms, e.g. acronyms
 
     # Search vectoring
     move_to: str | None = None
@@ -45,15 +79,98 @@ class BaseQuery(BaseModel):
     move_away_from: str | None = None
     move_away_from_weight: float | None = None
 
+    # Near-duplicate collapsing
+    dedup: bool = False
+    dedup_threshold: float = 0.8
+    max_per_paper: int | None = None
+
+    # Neighboring paragraphs
+    context_window: int = 0
+
+    # Cross-encoder reranking
+    rerank: bool = False
+    rerank_budget: float | None = None
+
+    # Article metadata
+    include_metadata: bool = False
+
+    # Response fields (all by default)
+    fields: list[str] | None = None
+
+    @validator("fields")
+    @classmethod
+    def check_fields(cls, v: list[str] | None):
+        if v is None:
+            return v
+        invalid = set(v) - set(Document.model_fields)
+        assert not invalid, f"{invalid} are not valid Document fields"
+        return v
+
 
 class HybridQuery(BaseQuery):
     topic: Topic  # Override topic to be required
     screening_top_k: int = 100
 
 
+class PageQuery(BaseQuery):
+    """Paginated vector search query, resumable with the `cursor` of a previous page."""
+
+    question: str | None = None  # Not needed when resuming from a cursor
+    top_k: int = 1000  # Max number of documents streamed in this request
+    page_size: int = 100
+    cursor: str | None = None
+
+    @root_validator(skip_on_failure=True)
+    @classmethod
+    def check_question_or_cursor(cls, values: dict):
+        assert values.get("question") or values.get("cursor"), (
+            "question or cursor required"
+        )
+        assert not values.get("rerank"), "rerank does not preserve distance order"
+        assert not values.get("dedup"), "dedup does not preserve page offsets"
+        return values
+
+
+class PageState(BaseModel):
+    """Pagination state carried by a `vector_pages` cursor.
+
+    Cursors come back from clients, so the state is validated like the query that
+    started the pagination.
+    """
+
+    search: PageQuery
+    offset: int = Field(ge=0)
+    distance: float | None = None
+    keys: list[str] = []
+
+    @validator("search")
+    @classmethod
+    def check_search(cls, v: PageQuery):
+        assert v.question, "question required"
+        assert v.cursor is None, "nested cursor"
+        return v
+
+
 class ReactQuery(HybridQuery):
     openai_model_name: str = "gpt-4-1106-preview"
 
+    # NDJSON `react_streaming` also sends `token` events and empty heartbeat lines
+    stream_tokens: bool = False
+
+    # Context budget of retrieved documents, in tokens
+    step_token_budget: int = 3000
+    chain_token_budget: int = 12000
+
+
+class Paper(BaseModel):
+    """Article metadata output data model."""
+
+    title: str | None = None
+    author: str | None = None
+    year: str | None = None
+    journal: str | None = None
+    url: str | None = None
+
 
 class Document(BaseModel):
     """Retriever document output data model.
@@ -65,7 +182,11 @@ class Document(BaseModel):
         doc_type: document type
         text_content: paragraph text
         cosmos_object_id: cosmos object id
+        paragraph_order: position of the paragraph in the paper
         distance: distance to query vector
+        rerank_score: cross-encoder relevance score, only available when reranked
+        paper: article metadata, only available with `include_metadata`
+        context: neighboring paragraphs, ordered by `paragraph_order`
     """
 
     paper_id: str
@@ -75,23 +196,18 @@ class Document(BaseModel):
     text_content: str
     hashed_text: str | None = None
     cosmos_object_id: str | None = None
+    paragraph_order: int | None = None
     distance: float | None = None
+    rerank_score: float | None = None
+    paper: Paper | None = None
+    context: list["Document"] | None = None
 
     @validator("topic_list")
     @classmethod
     def check_and_normalize_topic(cls, v: list[str]):
-        normalized = []
-        for topic in v:
-            if topic in ["covid-19", "covid", "xdd-covid-19"]:
-                topic = Topic.COVID
-            if isinstance(topic, str):
-                topic = Topic(topic)
-            normalized.append(topic)
-        return normalized
+        return [to_topic(topic) for topic in v]
 
     @validator("doc_type")
     @classmethod
     def check_doc_type(cls, v: str):
-        v = v.lower()
-        assert v.upper() in DocType.__members__, f"{v=} is not a valid doc_type"
-        return DocType(v)
+        return to_doc_type(v)
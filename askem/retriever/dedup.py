@@ -0,0 +1,101 @@
+import random
+import re
+import zlib
+
+# MinHash parameters, changing any of these invalidates the signatures stored in Weaviate.
+NUM_PERM = 64
+SHINGLE_SIZE = 5
+MINHASH_SEED = 42
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(MINHASH_SEED)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def get_shingles(text: str, size: int = SHINGLE_SIZE) -> set[int]:
+    """Get the set of hashed word `size`-grams of a text."""
+
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())}
+
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode())
+        for i in range(len(words) - size + 1)
+    }
+
+
+def get_minhash(text: str) -> list[int]:
+    """Get the MinHash signature of a text for the `text_minhash` property in Weaviate."""
+
+    shingles = get_shingles(text)
+    return [
+        min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_jaccard(signature_a: list[int], signature_b: list[int]) -> float:
+    """Estimate Jaccard similarity between two MinHash signatures."""
+
+    if len(signature_a) != len(signature_b):
+        raise ValueError("MinHash signatures must have the same length.")
+
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def collapse_duplicates(
+    results: list[dict],
+    top_k: int,
+    threshold: float = 0.8,
+    max_per_paper: int | None = None,
+) -> list[dict]:
+    """Greedily select `top_k` distinct results from a relevance-ordered list.
+
+    Each candidate is compared against the results already selected (MMR-style): it
+    is dropped when its `hashed_text` was seen before, when its estimated Jaccard
+    similarity to a selected result reaches `threshold`, or when its paper already
+    contributed `max_per_paper` results.
+
+    Args:
+        results: Weaviate results, sorted by relevance.
+        top_k: Number of results to return.
+        threshold: Estimated Jaccard similarity above which two results are duplicates.
+        max_per_paper: Max number of results per `paper_id`. Defaults to None (No cap).
+    """
+
+    selected = []
+    seen_hashes = set()
+    signatures = []
+    paper_counts = {}
+
+    for result in results:
+        if len(selected) >= top_k:
+            break
+
+        hashed_text = result.get("hashed_text")
+        if hashed_text is not None and hashed_text in seen_hashes:
+            continue
+
+        paper_id = result.get("paper_id")
+        if max_per_paper is not None and paper_counts.get(paper_id, 0) >= max_per_paper:
+            continue
+
+        # Objects ingested before `text_minhash` existed are signed on the fly
+        signature = result.get("text_minhash") or get_minhash(result["text_content"])
+        if any(estimate_jaccard(signature, s) >= threshold for s in signatures):
+            continue
+
+        selected.append(result)
+        seen_hashes.add(hashed_text)
+        signatures.append(signature)
+        paper_counts[paper_id] = paper_counts.get(paper_id, 0) + 1
+
+    return selected
@@ -1,22 +1,48 @@
 import logging
 import os
-from typing import Iterator
+from functools import lru_cache
 
-import langchain
 import requests
-import tenacity
+import weaviate
 
 # These are for docker
 from base import get_client, get_documents
 from data_models import Document
-from langchain.agents import initialize_agent
-from langchain.agents.agent_iterator import AgentExecutorIterator
 
 # These are for local dev testing
 # from .base import get_client, get_documents
 # from .data_models import Document
 
-WEAVIATE_CLIENT = get_client()
+# ReAct names, served lazily from `react` to keep langchain out of vector-only startup
+REACT_EXPORTS = {
+    "HEARTBEAT_INTERVAL",
+    "EventQueueHandler",
+    "ReactManager",
+    "react_search",
+}
+
+
+def __getattr__(name: str):
+    if name in REACT_EXPORTS:
+        import react
+
+        return getattr(react, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=1)
+def get_weaviate_client() -> weaviate.Client:
+    """Connect to Weaviate on first use, failed connections are retried next call."""
+    return get_client()
+
+
+def is_ready() -> bool:
+    """Readiness of the retriever, i.e. Weaviate is reachable and ready."""
+    try:
+        return get_weaviate_client().is_ready()
+    except Exception as e:
+        logging.warning(f"Weaviate is not ready: {e}")
+        return False
 
 
 def query_xdd(query: str, top_k: int, dataset: str) -> dict:
@@ -55,7 +81,7 @@ def get_contents(response: dict, path: list, field: str) -> list[any]:
 
 # Vector search
 def vector_search(**kwargs) -> list[Document]:
-    return get_documents(client=WEAVIATE_CLIENT, **kwargs)
+    return get_documents(client=get_weaviate_client(), **kwargs)
 
 
 # Hybrid search
@@ -72,97 +98,7 @@ def hybrid_search(
     return get_documents(
         question=question,
         topic=topic,
-        client=WEAVIATE_CLIENT,
+        client=get_weaviate_client(),
         paper_ids=paper_ids,
         **kwargs,
     )
-
-
-def get_llm(model_name: str):
-    """Get LLM instance."""
-    return langchain.chat_models.ChatOpenAI(model_name=model_name, temperature=0)
-
-
-class ReactManager:
-    """Manage information in a single search chain."""
-
-    def __init__(
-        self,
-        search_config: dict,
-        openai_model_name: str,
-        verbose: bool = False,
-    ):
-        self.search_config = search_config
-        self.openai_model_name = openai_model_name
-        self.used_docs = []
-        self.latest_used_docs = []
-
-        # Retriever + ReAct agent
-        self.agent_executor = initialize_agent(
-            tools=self.react_tools(),
-            llm=get_llm(self.openai_model_name),
-            agent=langchain.agents.AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            verbose=verbose,
-            handle_parsing_errors=True,
-        )
-
-    def react_tools(self) -> list[any]:
-        """Tool set provided to ReAct."""
-        hybrid_search = langchain.tools.StructuredTool.from_function(
-            self._search_retriever
-        )
-        return [hybrid_search]
-
-    def _search_retriever(self, question: str) -> str:
-        """Useful when you need to answer question about facts."""
-        # Do NOT change the doc-string of this function, it will affect how ReAct works!
-
-        relevant_docs = hybrid_search(
-            question=question,
-            **self.search_config,
-        )
-
-        # Collect used documents
-        self.used_docs.extend(relevant_docs)
-        self.latest_used_docs = relevant_docs
-        return "\n\n".join([r.text_content for r in relevant_docs])
-
-    def get_iterator(self, question: str) -> AgentExecutorIterator:
-        """ReAct iterator."""
-        return self.agent_executor.iter(inputs={"input": question})
-
-    def run(self, question: str) -> str:
-        """Run the chain until the end."""
-        return self.agent_executor.invoke({"input", question})["output"]
-
-
-@tenacity.retry(
-    wait=tenacity.wait_random_exponential(min=3, max=15),
-    stop=tenacity.stop_after_attempt(6),
-)
-def react_search(
-    question: str,
-    topic: str,
-    openai_model_name: str = "gpt-4-1106-preview",
-    streaming: bool = False,
-    **kwargs,
-) -> dict | Iterator[dict]:
-    """Convinience function to run ReAct search."""
-
-    kwargs["topic"] = topic
-    chain = ReactManager(
-        openai_model_name=openai_model_name,
-        search_config=kwargs,
-        verbose=False,
-    )
-
-    if not streaming:
-        answer = chain.run(question)
-        output = {"answer": answer, "used_docs": chain.used_docs}
-
-        # Reset used docs and latest used docs
-        chain.used_docs = []
-        chain.latest_used_docs = []
-        return output
-
-    return chain.get_iterator(question)
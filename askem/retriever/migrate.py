@@ -1,7 +1,12 @@
-from typing import Protocol
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Iterator, Protocol
 
 import tqdm
 import weaviate
+from data_models import TOPIC_ALIASES
+from writer import BatchWriter
 
 
 def get_batch_with_cursor(
@@ -24,6 +29,12 @@ def get_batch_with_cursor(
         return query.do()
 
 
+def get_count(client: weaviate.Client, class_name: str) -> int:
+    """Number of objects in a class."""
+    response = client.query.aggregate(class_name).with_meta_count().do()
+    return response["data"]["Aggregate"][class_name][0]["meta"]["count"]
+
+
 class ResponseParser(Protocol):
     """Response parsing function."""
 
@@ -55,18 +66,19 @@ class MigrationManager:
         source_client: weaviate.Client,
         destination_client: weaviate.Client,
         class_name: str,
+        destination_class_name: str | None = None,
     ) -> None:
         self.source_client = source_client
         self.destination_client = destination_client
         self.class_name = class_name
 
+        # e.g. a new schema version `Paragraph_v3`, built while `class_name` serves
+        self.destination_class_name = destination_class_name or class_name
+
     @property
     def source_n(self) -> int:
         """Number of objects in the source."""
-        response = (
-            self.source_client.query.aggregate(self.class_name).with_meta_count().do()
-        )
-        return response["data"]["Aggregate"]["Passage"][0]["meta"]["count"]
+        return get_count(self.source_client, self.class_name)
 
     def clone(
         self,
@@ -74,6 +86,7 @@ class MigrationManager:
         parsing_function: ResponseParser,
         batch_size: int = 1000,
         debug: bool = False,
+        writer: BatchWriter | None = None,
     ) -> None:
         """Clone all data from the source to the destination.
 
@@ -82,10 +95,12 @@ class MigrationManager:
             parsing_function: A function that converts a response from the source to a payload for the destination, see `ResponseParser` for function signature.
             batch_size: The batch size to use when retrieving data from the source.
             debug: If True, only one batch will be cloned.
+            writer: Writer to the destination, with its own adaptive batch size. Defaults to a single worker on `destination_client`.
         """
 
         cursor = None
-        self.destination_client.batch.configure(batch_size=batch_size, dynamic=True)
+        if writer is None:
+            writer = BatchWriter(lambda: self.destination_client, workers=1)
 
         progress_bar = tqdm.tqdm(total=(self.source_n // batch_size) + 1)
 
@@ -105,13 +120,254 @@ class MigrationManager:
 
             # Process data and add it to the destination
             data, vectors, cursor = parsing_function(response)
-            with self.destination_client.batch as batch:
-                for i, x in enumerate(data):
-                    batch.add_data_object(x, self.class_name, vector=vectors[i])
+            for i, x in enumerate(data):
+                writer.add_object(x, self.destination_class_name, vector=vectors[i])
 
             progress_bar.update(1)
 
             if debug:
-                progress_bar.close()
                 break
+        writer.close()
         progress_bar.close()
+
+
+@dataclass
+class StoredObject:
+    """An object read back from Weaviate, as needed to write it again."""
+
+    uuid: str
+    properties: dict  # Non-null properties, without references
+    vector: list[float] | None
+    paper_uuids: list[str]  # Targets of the `paper` reference
+
+
+def iter_objects(
+    client: weaviate.Client,
+    class_name: str,
+    paper_class_name: str = "Paper",
+    batch_size: int = 1000,
+) -> Iterator[list[StoredObject]]:
+    """Iterate over batches of all objects of a class, with vectors and references."""
+
+    properties = [p["name"] for p in client.schema.get(class_name)["properties"]]
+    fields = [name for name in properties if name != "paper"]
+    if "paper" in properties:
+        paper = f"paper {{ ... on {paper_class_name} {{ _additional {{ id }} }} }}"
+        fields.append(paper)
+
+    cursor = None
+    while True:
+        response = get_batch_with_cursor(
+            client, class_name, fields, batch_size, cursor=cursor
+        )
+        data = response["data"]["Get"][class_name]
+        if not data:
+            break
+        cursor = data[-1]["_additional"]["id"]
+
+        batch = []
+        for x in data:
+            additional = x.pop("_additional")
+            references = x.pop("paper", None) or []
+            batch.append(
+                StoredObject(
+                    uuid=additional["id"],
+                    properties={k: v for k, v in x.items() if v is not None},
+                    vector=additional["vector"],
+                    paper_uuids=[r["_additional"]["id"] for r in references],
+                )
+            )
+        yield batch
+
+
+def write_object(
+    writer: BatchWriter,
+    obj: StoredObject,
+    class_name: str,
+    paper_class_name: str = "Paper",
+) -> None:
+    """Write an object with its vector and references, replacing it if it exists."""
+
+    vector = obj.vector or None  # Classes without vectorizer, e.g. `Paper`
+    writer.add_object(obj.properties, class_name, uuid=obj.uuid, vector=vector)
+    for paper_uuid in obj.paper_uuids:
+        writer.add_reference(
+            from_object_uuid=obj.uuid,
+            from_object_class_name=class_name,
+            from_property_name="paper",
+            to_object_uuid=paper_uuid,
+            to_object_class_name=paper_class_name,
+        )
+
+
+def copy_objects(
+    client: weaviate.Client,
+    class_name: str,
+    route: Callable[[dict], list[str]],
+    paper_class_name: str = "Paper",
+    batch_size: int = 1000,
+    writer: BatchWriter | None = None,
+) -> Counter:
+    """Copy the objects of a class into the classes returned by `route`.
+
+    Vectors are copied (nothing is re-vectorized) and objects keep their uuid, so an
+    interrupted copy can be run again, and again to catch up with objects ingested
+    meanwhile while the source class keeps serving.
+
+    Args:
+        class_name: Source class.
+        route: Function of an object's properties to its destination classes.
+        paper_class_name: Class referenced by the `paper` property.
+        batch_size: The batch size to use when retrieving data from the source.
+        writer: Writer to the destinations. Defaults to a single worker on `client`.
+
+    Returns:
+        Number of objects copied to each destination class.
+    """
+
+    if writer is None:
+        writer = BatchWriter(lambda: client, workers=1)
+
+    n = get_count(client, class_name)
+    counts = Counter()
+
+    with tqdm.tqdm(total=n) as progress_bar:
+        for batch in iter_objects(client, class_name, paper_class_name, batch_size):
+            for obj in batch:
+                for destination in route(obj.properties):
+                    write_object(writer, obj, destination, paper_class_name)
+                    counts[destination] += 1
+            progress_bar.update(len(batch))
+
+    writer.close()
+    return counts
+
+
+def normalize_filter_values(x: dict) -> dict:
+    """Store `topic_list` and `doc_type` as the exact values used in filters.
+
+    Legacy topic names are replaced by their `Topic` value, unknown topics are kept.
+    """
+
+    if x.get("topic_list"):
+        x["topic_list"] = sorted(
+            {
+                TOPIC_ALIASES[topic].value if topic in TOPIC_ALIASES else topic
+                for topic in x["topic_list"]
+            }
+        )
+    if x.get("doc_type"):
+        x["doc_type"] = x["doc_type"].lower()
+    return x
+
+
+def rebuild_class(
+    client: weaviate.Client,
+    class_name: str,
+    destination: str,
+    paper_class_name: str = "Paper",
+    batch_size: int = 1000,
+    writer: BatchWriter | None = None,
+) -> int:
+    """Copy a class into `destination`, created beforehand with the current schema.
+
+    Property indexes and tokenization can't be changed in place. Filter values are
+    normalized on the way, field tokenized filters match them exactly.
+
+    Returns:
+        Number of objects copied.
+    """
+
+    def route(x: dict) -> list[str]:
+        normalize_filter_values(x)
+        return [destination]
+
+    counts = copy_objects(
+        client, class_name, route, paper_class_name, batch_size, writer
+    )
+    return counts[destination]
+
+
+def split_by_topic(
+    client: weaviate.Client,
+    class_name: str,
+    topic_class_names: dict[str, str],
+    paper_class_name: str = "Paper",
+    batch_size: int = 1000,
+    writer: BatchWriter | None = None,
+) -> Counter:
+    """Copy each object of a shared class into the class of each of its topics.
+
+    Args:
+        class_name: Source class holding all topics.
+        topic_class_names: Mapping of `topic_list` values to their destination class.
+        paper_class_name: Class referenced by the `paper` property.
+        batch_size: The batch size to use when retrieving data from the source.
+
+    Returns:
+        Number of objects copied to each destination class.
+    """
+
+    def route(x: dict) -> list[str]:
+        normalize_filter_values(x)
+        destinations = []
+        for topic in set(x.get("topic_list") or []):
+            if topic not in topic_class_names:
+                logging.warning(f"Skipping unknown topic {topic}")
+                continue
+            destinations.append(topic_class_names[topic])
+        return destinations
+
+    return copy_objects(client, class_name, route, paper_class_name, batch_size, writer)
+
+
+VALIDATION_QUESTIONS = [
+    "What is the incubation period of COVID-19?",
+    "How do dolomites form?",
+]
+
+
+def validate_class(
+    client: weaviate.Client,
+    class_name: str,
+    reference_class_name: str | None = None,
+    min_count_ratio: float = 0.99,
+    questions: list[str] = VALIDATION_QUESTIONS,
+) -> list[str]:
+    """Check a class is ready to serve reads, e.g. before switching an alias to it.
+
+    Args:
+        class_name: Class to validate.
+        reference_class_name: Class currently serving, e.g. the previous version.
+        min_count_ratio: Min number of objects, relative to the reference class.
+        questions: Vector search smoke test questions, each must return a result.
+
+    Returns:
+        Problems found, empty if the class is valid.
+    """
+
+    if not client.schema.exists(class_name):
+        return [f"{class_name} does not exist"]
+
+    problems = []
+    n = get_count(client, class_name)
+    if n == 0:
+        problems.append(f"{class_name} is empty")
+
+    if reference_class_name is not None and client.schema.exists(reference_class_name):
+        reference_n = get_count(client, reference_class_name)
+        if n < min_count_ratio * reference_n:
+            problems.append(f"{class_name} has {n} objects, {reference_n} expected")
+
+    for question in questions:
+        response = (
+            client.query.get(class_name, ["paper_id"])
+            .with_near_text({"concepts": [question]})
+            .with_limit(1)
+            .do()
+        )
+        if "errors" in response:
+            problems.append(f"Search failed: {response['errors']}")
+        elif not response["data"]["Get"][class_name]:
+            problems.append(f"No results for {question!r}")
+    return problems
@@ -0,0 +1,108 @@
+import hashlib
+import logging
+from functools import lru_cache
+
+import tiktoken
+from data_models import Document
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """Get the (cached) tokenizer of an OpenAI model."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        logging.warning(f"No tokenizer for {model_name}, using {DEFAULT_ENCODING}")
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model_name: str) -> int:
+    """Count tokens of a text for a model."""
+    return len(get_encoding(model_name).encode(text, disallowed_special=()))
+
+
+def truncate(text: str, n_tokens: int, model_name: str) -> str:
+    """Truncate a text to its first `n_tokens` tokens."""
+    encoding = get_encoding(model_name)
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:n_tokens])
+
+
+def to_passage(document: Document) -> str:
+    """Join a document with its neighboring paragraphs in reading order."""
+
+    if not document.context:
+        return document.text_content
+
+    paragraphs = sorted(
+        [*document.context, document], key=lambda doc: doc.paragraph_order
+    )
+    return "\n".join([doc.text_content for doc in paragraphs])
+
+
+class ContextPacker:
+    """Pack retrieved documents into a token budget across a ReAct chain.
+
+    Documents already packed earlier in the chain (by `hashed_text`) are skipped,
+    and documents that do not fit the remaining step or chain budget are dropped,
+    except the top document, which is truncated to the remaining budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        step_token_budget: int = 3000,
+        chain_token_budget: int = 12000,
+    ) -> None:
+        self.model_name = model_name
+        self.step_token_budget = step_token_budget
+        self.chain_token_budget = chain_token_budget
+        self.seen_hashes = set()
+        self.used_tokens = 0
+        self.saved_tokens = 0
+
+    def pack(self, documents: list[Document]) -> tuple[list[Document], str]:
+        """Select documents for one tool call and return them with the tool output."""
+
+        packed = []
+        passages = []
+        step_tokens = 0
+
+        for doc in documents:
+            passage = to_passage(doc)
+            n = count_tokens(passage, self.model_name)
+            key = (
+                doc.hashed_text or hashlib.sha256(doc.text_content.encode()).hexdigest()
+            )
+
+            if key in self.seen_hashes:
+                self.saved_tokens += n
+                continue
+
+            remaining = min(
+                self.step_token_budget - step_tokens,
+                self.chain_token_budget - self.used_tokens,
+            )
+            if n > remaining:
+                if packed or remaining <= 0:
+                    self.saved_tokens += n
+                    continue
+
+                # Keep the top document rather than returning no documents
+                passage = truncate(passage, remaining, self.model_name)
+                self.saved_tokens += n - remaining
+                n = remaining
+
+            self.seen_hashes.add(key)
+            self.used_tokens += n
+            step_tokens += n
+            packed.append(doc)
+            passages.append(passage)
+
+        logging.info(
+            f"Packed {len(packed)}/{len(documents)} documents ({step_tokens} tokens), "
+            f"chain total {self.used_tokens} tokens, saved {self.saved_tokens} tokens"
+        )
+        return packed, "\n\n".join(passages)
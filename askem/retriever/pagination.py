@@ -0,0 +1,148 @@
+import base64
+import logging
+import os
+from typing import Callable, Iterator
+
+import orjson
+from data_models import Document, PageQuery, PageState
+from fastapi import HTTPException, status
+
+# PageQuery fields of the page walk itself, not passed to the search function
+PAGE_FIELDS = {"fields", "top_k", "offset", "page_size", "cursor"}
+
+# Weaviate rejects queries with offset + limit above its QUERY_MAXIMUM_RESULTS
+QUERY_MAXIMUM_RESULTS = int(os.getenv("QUERY_MAXIMUM_RESULTS", 10_000))
+
+
+def get_search_config(query: PageQuery) -> dict:
+    """Search arguments of a paginated query."""
+    return query.model_dump(mode="json", exclude_none=True, exclude=PAGE_FIELDS)
+
+
+def encode_cursor(state: dict) -> str:
+    """Encode pagination state into an opaque continuation token."""
+    return base64.urlsafe_b64encode(orjson.dumps(state)).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode and validate a continuation token produced by `encode_cursor`.
+
+    Raises:
+        HTTPException: 400 if the token is not a valid pagination state, e.g. forged
+            or from an older version.
+    """
+    try:
+        state = PageState.model_validate_json(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:  # Also pydantic `ValidationError` and base64 errors
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+    return {
+        "search": get_search_config(state.search),
+        "offset": state.offset,
+        "distance": state.distance,
+        "keys": state.keys,
+    }
+
+
+def document_key(document: Document) -> str:
+    """Identify a document across pages."""
+    return f"{document.paper_id}:{document.paragraph_order}:{document.hashed_text}"
+
+
+def iter_pages(
+    search: Callable[..., list[Document]],
+    search_config: dict | None = None,
+    page_size: int = 100,
+    max_documents: int = 1000,
+    offset: int = 0,
+    cursor: str | None = None,
+) -> Iterator[tuple[list[Document], str | None]]:
+    """Walk a search result list page by page, ordered by distance.
+
+    The continuation token carries the search config, the offset of the next page,
+    and the last distance with the documents seen at that distance, so pages do not
+    repeat documents if the index shifts between requests. The cursor is decoded
+    when called, so an invalid cursor raises before a response starts streaming. The
+    walk ends at Weaviate's `QUERY_MAXIMUM_RESULTS`, the last page has no cursor.
+
+    Args:
+        search: Search function accepting `top_k` and `offset`, e.g. `vector_search`.
+        search_config: Search arguments, ignored when resuming from a cursor.
+        page_size: Number of documents per page.
+        max_documents: Max number of documents yielded in this call.
+        offset: Number of top documents to skip on the first page. Defaults to 0.
+        cursor: Continuation token from a previous page. Defaults to None (First page).
+
+    Yields:
+        Documents of a page and the continuation token, None on the last page.
+
+    Raises:
+        HTTPException: 400 if the cursor is invalid or the offset is beyond
+            `QUERY_MAXIMUM_RESULTS`.
+    """
+
+    if cursor is not None:
+        state = decode_cursor(cursor)
+    else:
+        state = {
+            "search": search_config,
+            "offset": offset,
+            "distance": None,
+            "keys": [],
+        }
+
+    if state["offset"] >= QUERY_MAXIMUM_RESULTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"offset must be below {QUERY_MAXIMUM_RESULTS}",
+        )
+    return _iter_pages(search, state, page_size, max_documents)
+
+
+def _iter_pages(
+    search: Callable[..., list[Document]],
+    state: dict,
+    page_size: int,
+    max_documents: int,
+) -> Iterator[tuple[list[Document], str | None]]:
+    n = 0
+    while n < max_documents:
+        limit = min(
+            page_size, max_documents - n, QUERY_MAXIMUM_RESULTS - state["offset"]
+        )
+
+        try:
+            documents = search(**state["search"], top_k=limit, offset=state["offset"])
+        except HTTPException as e:
+            if e.status_code != status.HTTP_404_NOT_FOUND:
+                raise
+            documents = []
+
+        state["offset"] += len(documents)
+        is_last = len(documents) < limit or state["offset"] >= QUERY_MAXIMUM_RESULTS
+
+        # Skip documents already emitted before the last distance
+        if state["distance"] is not None:
+            seen = set(state["keys"])
+            documents = [
+                doc
+                for doc in documents
+                if doc.distance > state["distance"]
+                or (doc.distance == state["distance"] and document_key(doc) not in seen)
+            ]
+
+        for doc in documents:
+            if doc.distance != state["distance"]:
+                state["distance"] = doc.distance
+                state["keys"] = []
+            state["keys"].append(document_key(doc))
+
+        n += len(documents)
+        next_cursor = None if is_last else encode_cursor(state)
+        logging.debug(f"Page with {len(documents)} documents, offset {state['offset']}")
+        yield documents, next_cursor
+
+        if is_last:
+            break
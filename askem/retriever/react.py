@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Iterator
+
+import langchain
+import tenacity
+from engine import hybrid_search
+from langchain.agents import initialize_agent
+from langchain.agents.agent_iterator import AgentExecutorIterator
+from langchain.callbacks.base import AsyncCallbackHandler
+from langchain.schema import AgentAction, AgentFinish
+from packing import ContextPacker
+
+# Seconds without events before a heartbeat is emitted
+HEARTBEAT_INTERVAL = 15.0
+
+
+def get_llm(model_name: str, streaming: bool = False):
+    """Get LLM instance."""
+    return langchain.chat_models.ChatOpenAI(
+        model_name=model_name, temperature=0, streaming=streaming
+    )
+
+
+class EventQueueHandler(AsyncCallbackHandler):
+    """Push LLM tokens, agent thoughts and final answer to an event queue."""
+
+    def __init__(self, queue: asyncio.Queue) -> None:
+        self.queue = queue
+
+    async def on_llm_new_token(self, token: str, **kwargs) -> None:
+        await self.queue.put({"token": token})
+
+    async def on_agent_action(self, action: AgentAction, **kwargs) -> None:
+        for log in action.log.split("\n"):
+            if log:
+                await self.queue.put({"thoughts": log})
+
+    async def on_agent_finish(self, finish: AgentFinish, **kwargs) -> None:
+        await self.queue.put({"answer": finish.return_values["output"]})
+
+
+class ReactManager:
+    """Manage information in a single search chain."""
+
+    def __init__(
+        self,
+        search_config: dict,
+        openai_model_name: str,
+        verbose: bool = False,
+        step_token_budget: int = 3000,
+        chain_token_budget: int = 12000,
+    ):
+        self.search_config = search_config
+        self.openai_model_name = openai_model_name
+        self.used_docs = []
+        self.latest_used_docs = []
+        self.events = None  # Event queue, only set while streaming with `astream`
+        self.cancelled = threading.Event()  # Set when a stream is closed early
+        self.packer = ContextPacker(
+            model_name=openai_model_name,
+            step_token_budget=step_token_budget,
+            chain_token_budget=chain_token_budget,
+        )
+
+        # Retriever + ReAct agent
+        self.agent_executor = initialize_agent(
+            tools=self.react_tools(),
+            llm=get_llm(self.openai_model_name, streaming=True),
+            agent=langchain.agents.AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=verbose,
+            handle_parsing_errors=True,
+        )
+
+    def react_tools(self) -> list[any]:
+        """Tool set provided to ReAct."""
+        hybrid_search = langchain.tools.StructuredTool.from_function(
+            func=self._search_retriever,
+            coroutine=self._asearch_retriever,
+        )
+        return [hybrid_search]
+
+    def _search_retriever(self, question: str) -> str:
+        """Useful when you need to answer question about facts."""
+        # Do NOT change the doc-string of this function, it will affect how ReAct works!
+
+        # Retrieval threads outlive a cancelled chain, skip work nobody will read
+        if self.cancelled.is_set():
+            return ""
+
+        relevant_docs = hybrid_search(
+            question=question,
+            **self.search_config,
+        )
+        if self.cancelled.is_set():
+            return ""
+
+        # Skip repeated documents and trim to token budget
+        packed_docs, context = self.packer.pack(relevant_docs)
+
+        # Collect used documents
+        self.used_docs.extend(packed_docs)
+        self.latest_used_docs = packed_docs
+
+        if not packed_docs:
+            return "No new relevant documents found."
+        return context
+
+    async def _asearch_retriever(self, question: str) -> str:
+        """Useful when you need to answer question about facts."""
+        # Do NOT change the doc-string of this function, it will affect how ReAct works!
+
+        context = await asyncio.to_thread(self._search_retriever, question)
+
+        # Emit documents as soon as they are retrieved
+        events = self.events
+        if events is not None and self.latest_used_docs:
+            await events.put({"used_docs": self.latest_used_docs})
+        return context
+
+    async def astream(
+        self, question: str, heartbeat: float = HEARTBEAT_INTERVAL
+    ) -> AsyncIterator[dict]:
+        """Stream chain events: `token`, `thoughts`, `used_docs`, `answer`, `error`.
+
+        An empty event is yielded as heartbeat after `heartbeat` seconds of silence.
+        Closing the iterator (e.g. client disconnect) cancels the running chain, and
+        a retrieval already running in its thread is discarded when it returns.
+        """
+
+        # The done callback may run after `self.events` is reset, keep the queue
+        events = self.events = asyncio.Queue()
+        self.cancelled.clear()
+        task = asyncio.create_task(
+            self.agent_executor.ainvoke(
+                {"input": question},
+                config={"callbacks": [EventQueueHandler(events)]},
+            )
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
+
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield {}
+                    continue
+
+                if event is None:
+                    break
+                yield event
+
+            if not task.cancelled() and task.exception() is not None:
+                logging.error(f"ReAct chain failed: {task.exception()}")
+                yield {"error": str(task.exception())}
+        finally:
+            if not task.done():
+                logging.info("Cancelling ReAct chain")
+                self.cancelled.set()
+                task.cancel()
+            self.events = None
+
+    def get_iterator(self, question: str) -> AgentExecutorIterator:
+        """ReAct iterator."""
+        return self.agent_executor.iter(inputs={"input": question})
+
+    def run(self, question: str) -> str:
+        """Run the chain until the end."""
+        return self.agent_executor.invoke({"input", question})["output"]
+
+
+@tenacity.retry(
+    wait=tenacity.wait_random_exponential(min=3, max=15),
+    stop=tenacity.stop_after_attempt(6),
+)
+def react_search(
+    question: str,
+    topic: str,
+    openai_model_name: str = "gpt-4-1106-preview",
+    streaming: bool = False,
+    step_token_budget: int = 3000,
+    chain_token_budget: int = 12000,
+    **kwargs,
+) -> dict | Iterator[dict]:
+    """Convinience function to run ReAct search."""
+
+    kwargs["topic"] = topic
+    chain = ReactManager(
+        openai_model_name=openai_model_name,
+        search_config=kwargs,
+        verbose=False,
+        step_token_budget=step_token_budget,
+        chain_token_budget=chain_token_budget,
+    )
+
+    if not streaming:
+        answer = chain.run(question)
+        output = {
+            "answer": answer,
+            "used_docs": chain.used_docs,
+            "tokens_saved": chain.packer.saved_tokens,
+        }
+
+        # Reset used docs and latest used docs
+        chain.used_docs = []
+        chain.latest_used_docs = []
+        return output
+
+    return chain.get_iterator(question)
@@ -0,0 +1,127 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+RERANKER_MODEL_NAME = os.getenv(
+    "RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)
+RERANKER_BATCH_SIZE = 16
+RERANKER_PRELOAD = os.getenv("RERANKER_PRELOAD", "true").lower() == "true"
+SCORE_CACHE_SIZE = 50_000
+
+
+class ScoreCache:
+    """Thread-safe LRU cache of cross-encoder scores keyed by (question hash, hashed_text)."""
+
+    def __init__(self, max_size: int = SCORE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> float | None:
+        with self._lock:
+            if key not in self._scores:
+                return None
+            self._scores.move_to_end(key)
+            return self._scores[key]
+
+    def set(self, key: tuple[str, str], score: float) -> None:
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            if len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+
+SCORE_CACHE = ScoreCache()
+
+
+_load_lock = threading.Lock()
+
+
+@lru_cache
+def is_available() -> bool:
+    """Whether the optional reranker dependencies (`requirements-rerank.txt`) are installed."""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+
+@lru_cache
+def _load_cross_encoder(model_name: str):
+    from sentence_transformers import CrossEncoder
+
+    logging.info(f"Loading cross-encoder {model_name}")
+    return CrossEncoder(model_name, device="cpu", max_length=512)
+
+
+def get_cross_encoder(model_name: str = RERANKER_MODEL_NAME):
+    """Load a cross-encoder on CPU once per process."""
+
+    with _load_lock:
+        return _load_cross_encoder(model_name)
+
+
+def preload() -> None:
+    """Load the cross-encoder in the background at startup, when installed."""
+
+    if RERANKER_PRELOAD and is_available():
+        threading.Thread(target=get_cross_encoder, daemon=True).start()
+
+
+def rerank(
+    question: str,
+    results: list[dict],
+    budget: float | None = None,
+    cache: ScoreCache = SCORE_CACHE,
+) -> list[dict]:
+    """Rescore (question, text_content) pairs with a cross-encoder and sort by score.
+
+    Args:
+        question: Query string.
+        results: Weaviate results, sorted by vector distance.
+        budget: Scoring latency budget in seconds, excluding the model load. When exceeded, the original order is returned. It is a soft limit, checked between batches, so the last batch may overrun it. Defaults to None (No budget).
+        cache: Score cache.
+    """
+
+    if not is_available():
+        logging.warning("sentence-transformers is not installed, keep vector order")
+        return results
+
+    question_hash = hashlib.sha256(question.encode()).hexdigest()
+
+    scores = [
+        cache.get((question_hash, result["hashed_text"]))
+        if result.get("hashed_text")
+        else None
+        for result in results
+    ]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    logging.debug(f"Reranking {len(results)} results, {len(missing)} not cached")
+
+    if missing:
+        model = get_cross_encoder()
+
+    start = time.perf_counter()
+
+    # Batched inference, checking the budget between batches
+    for i in range(0, len(missing), RERANKER_BATCH_SIZE):
+        if budget is not None and time.perf_counter() - start > budget:
+            logging.warning(f"Reranking exceeded {budget}s budget, keep vector order")
+            return results
+
+        batch = missing[i : i + RERANKER_BATCH_SIZE]
+        pairs = [(question, results[j]["text_content"]) for j in batch]
+        for j, score in zip(batch, model.predict(pairs)):
+            scores[j] = float(score)
+            if results[j].get("hashed_text"):
+                cache.set((question_hash, results[j]["hashed_text"]), scores[j])
+
+    for result, score in zip(results, scores):
+        result["rerank_score"] = score
+
+    logging.info(f"Reranked in {time.perf_counter() - start:.3f}s")
+    return sorted(results, key=lambda result: result["rerank_score"], reverse=True)
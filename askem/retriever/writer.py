@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from uuid import uuid4
+
+import weaviate
+
+FAILURE_LOG = os.getenv("WEAVIATE_FAILURE_LOG", "tmp/failed_objects.jsonl")
+
+
+def get_error(result: dict) -> str | None:
+    """Error message of an object (or reference) in a batch response, if any."""
+
+    errors = (result.get("result") or {}).get("errors")
+    if not errors:
+        return None
+    return "; ".join(error["message"] for error in errors["error"])
+
+
+class BatchWriter:
+    """Concurrent Weaviate batch writer, with adaptive batch size and backpressure.
+
+    Objects are buffered and sent in batches of `batch_size` by `workers` threads,
+    each with its own client. The batch size grows while batches take less than half
+    `target_latency` and halves when a batch is slower or fails. `add_object` blocks
+    while `2 * workers` batches are pending (one running and one waiting per worker),
+    and while the vector indexing queue of Weaviate (async indexing) is deeper than
+    `max_vector_queue`.
+
+    Failed objects and references are retried `max_retries` times with exponential
+    backoff, then appended to the JSON lines `failure_log`, see `replay_failures`.
+
+    Args:
+        client_factory: Creates the client of each thread, e.g. `get_client`.
+        workers: Number of concurrent batch requests.
+        batch_size: Initial number of objects per batch.
+        min_batch_size: Smallest batch size, also the growth step.
+        max_batch_size: Largest batch size.
+        target_latency: Max seconds per batch request.
+        max_vector_queue: Max vector indexing queue length. Defaults to None (Not checked).
+        max_retries: Retries of failed objects and references.
+        backoff: Seconds before the first retry, doubled on each retry.
+        failure_log: Path of the failure log.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], weaviate.Client],
+        workers: int = 2,
+        batch_size: int = 64,
+        min_batch_size: int = 8,
+        max_batch_size: int = 1024,
+        target_latency: float = 5.0,
+        max_vector_queue: int | None = None,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        failure_log: str | Path = FAILURE_LOG,
+    ) -> None:
+        self.client_factory = client_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_vector_queue = max_vector_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failure_log = Path(failure_log)
+        self.stats = Counter()
+
+        self._objects = []
+        self._references = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers)
+        self._slots = threading.BoundedSemaphore(2 * workers)
+        self._futures = []
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get_client(self) -> weaviate.Client:
+        """Client of the current thread, in manual batching mode."""
+
+        if not hasattr(self._local, "client"):
+            self._local.client = self.client_factory()
+            self._local.client.batch.configure(
+                batch_size=None, dynamic=False, callback=None
+            )
+        return self._local.client
+
+    def add_object(
+        self,
+        data_object: dict,
+        class_name: str,
+        uuid: str | None = None,
+        vector: list[float] | None = None,
+    ) -> str:
+        """Buffer an object, and return its uuid.
+
+        A full buffer is sent before adding the object, so the references added
+        right after an object are sent in its batch.
+        """
+
+        if len(self._objects) >= self.batch_size:
+            self.flush()
+
+        uuid = str(uuid or uuid4())
+        self._objects.append(
+            {
+                "data_object": data_object,
+                "class_name": class_name,
+                "uuid": uuid,
+                "vector": vector,
+            }
+        )
+        return uuid
+
+    def add_reference(
+        self,
+        from_object_uuid: str,
+        from_object_class_name: str,
+        from_property_name: str,
+        to_object_uuid: str,
+        to_object_class_name: str | None = None,
+    ) -> None:
+        """Buffer a reference, sent after the objects of its batch."""
+
+        self._references.append(
+            {
+                "from_object_uuid": str(from_object_uuid),
+                "from_object_class_name": from_object_class_name,
+                "from_property_name": from_property_name,
+                "to_object_uuid": str(to_object_uuid),
+                "to_object_class_name": to_object_class_name,
+            }
+        )
+
+    def flush(self) -> None:
+        """Send the buffered objects and references as a batch."""
+
+        if not self._objects and not self._references:
+            return
+
+        # Raise errors of finished batches, e.g. an unwritable failure log
+        pending = []
+        for future in self._futures:
+            if future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self._futures = pending
+
+        objects, references = self._objects, self._references
+        self._objects, self._references = [], []
+
+        self._wait_for_vector_queue()
+        self._slots.acquire()
+        future = self._executor.submit(self._write, objects, references)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def join(self) -> None:
+        """Send the buffer and wait for all batches, including their retries."""
+
+        self.flush()
+        for future in self._futures:
+            future.result()
+        self._futures = []
+
+    def close(self) -> None:
+        self.join()
+        self._executor.shutdown()
+        logging.info(f"Batch writer stats: {dict(self.stats)}")
+
+    def get_vector_queue(self) -> int:
+        """Number of objects waiting for vector indexing, over all shards."""
+
+        nodes = self.get_client().cluster.get_nodes_status()
+        return sum(
+            shard.get("vectorQueueLength") or 0
+            for node in nodes
+            for shard in node.get("shards") or []
+        )
+
+    def _wait_for_vector_queue(self) -> None:
+        if self.max_vector_queue is None:
+            return
+
+        while (n := self.get_vector_queue()) > self.max_vector_queue:
+            logging.info(f"Waiting for {n} objects in the vector indexing queue")
+            self._adapt(None)
+            time.sleep(self.backoff)
+
+    def _count(self, key: str, n: int) -> None:
+        with self._lock:  # Counter updates are not atomic across threads
+            self.stats[key] += n
+
+    def _adapt(self, latency: float | None) -> None:
+        """Grow the batch size additively while fast, halve it when slow or failed."""
+
+        with self._lock:
+            if latency is None or latency > self.target_latency:
+                self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+            elif latency < self.target_latency / 2:
+                self.batch_size = min(
+                    self.batch_size + self.min_batch_size, self.max_batch_size
+                )
+
+    def _write(self, objects: list[dict], references: list[dict]) -> None:
+        self._retry("object", objects, self._send_objects)
+        self._retry("reference", references, self._send_references)
+
+    def _send_objects(self, objects: list[dict]) -> list[tuple[dict, str]]:
+        batch = self.get_client().batch
+        batch.empty_objects()
+        for obj in objects:
+            batch.add_data_object(**obj)
+        results = batch.create_objects()
+        errors = [get_error(result) for result in results]
+        return [(obj, error) for obj, error in zip(objects, errors) if error]
+
+    def _send_references(self, references: list[dict]) -> list[tuple[dict, str]]:
+        batch = self.get_client().batch
+        batch.empty_references()
+        for reference in references:
+            batch.add_reference(**reference)
+        results = batch.create_references()
+        errors = [get_error(result) for result in results]
+        return [(ref, error) for ref, error in zip(references, errors) if error]
+
+    def _retry(
+        self,
+        kind: str,
+        items: list[dict],
+        send: Callable[[list[dict]], list[tuple[dict, str]]],
+    ) -> None:
+        """Send items, retrying the failed ones, and log those that keep failing."""
+
+        failed = []
+        for attempt in range(self.max_retries + 1):
+            if not items:
+                break
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                self._count(f"{kind}_retries", len(items))
+
+            start = time.perf_counter()
+            try:
+                failed = send(items)
+                self._adapt(time.perf_counter() - start)
+            except Exception as e:  # Timeouts and connection errors fail the batch
+                logging.warning(f"Batch of {len(items)} {kind}s failed: {e}")
+                failed = [(item, repr(e)) for item in items]
+                self._adapt(None)
+
+            self._count(f"{kind}s", len(items) - len(failed))
+            items = [item for item, _ in failed]
+
+        if failed:
+            self._log_failures(kind, failed)
+
+    def _log_failures(self, kind: str, failed: list[tuple[dict, str]]) -> None:
+        logging.error(f"{len(failed)} {kind}s failed, logged to {self.failure_log}")
+        self._count(f"failed_{kind}s", len(failed))
+
+        with self._lock:
+            self.failure_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.failure_log, "a") as f:
+                for item, error in failed:
+                    f.write(
+                        json.dumps(
+                            {"kind": kind, "error": error, "item": item}, default=str
+                        )
+                    )
+                    f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def replay_failures(writer: BatchWriter, failure_log: str | Path) -> int:
+    """Write the objects and references of a failure log again.
+
+    The log is renamed to `<name>.replayed` first, failures of the replay are logged
+    to `writer.failure_log`.
+
+    Returns:
+        Number of replayed objects and references.
+    """
+
+    path = Path(failure_log)
+    replayed = path.rename(path.with_name(path.name + ".replayed"))
+
+    n = 0
+    with open(replayed) as f:
+        for line in f:
+            failure = json.loads(line)
+            if failure["kind"] == "object":
+                writer.add_object(**failure["item"])
+            else:
+                writer.add_reference(**failure["item"])
+            n += 1
+    writer.join()
+    return n
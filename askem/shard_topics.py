@@ -0,0 +1,60 @@
+import click
+from dotenv import load_dotenv
+
+from askem.retriever.base import get_client, get_topic_class_name, init_retriever
+from askem.retriever.data_models import TOPIC_ALIASES
+from askem.retriever.migrate import split_by_topic
+from askem.retriever.writer import BatchWriter
+
+load_dotenv()
+
+
+@click.command()
+@click.option("--weaviate-url", help="Weaviate URL.", type=str)
+@click.option("--class-name", default="Paragraph", type=str)
+@click.option("--paper-class-name", default="Paper", type=str)
+@click.option("--batch-size", default=1000, type=int)
+@click.option("--workers", default=2, help="Concurrent batch requests.", type=int)
+def main(
+    weaviate_url: str | None,
+    class_name: str,
+    paper_class_name: str,
+    batch_size: int,
+    workers: int,
+) -> None:
+    """Migrate a class shared by all topics to one class per topic.
+
+    The source class is left untouched. Once the topic classes are populated, set
+    `WEAVIATE_SHARD_BY_TOPIC=true` in the retriever to search them.
+
+    Usage:
+    python -m askem.shard_topics --weaviate-url http://url:8080 --class-name Paragraph
+    """
+
+    client = get_client(url=weaviate_url)
+    init_retriever(
+        client=client,
+        class_name=class_name,
+        paper_class_name=paper_class_name,
+        shard_by_topic=True,
+    )
+
+    # Legacy topic names (e.g. `covid-19`) are stored in their topic's class
+    topic_class_names = {
+        alias: get_topic_class_name(class_name, topic)
+        for alias, topic in TOPIC_ALIASES.items()
+    }
+    counts = split_by_topic(
+        client,
+        class_name,
+        topic_class_names,
+        paper_class_name=paper_class_name,
+        batch_size=batch_size,
+        writer=BatchWriter(lambda: get_client(url=weaviate_url), workers=workers),
+    )
+    for topic_class_name, n in counts.items():
+        click.echo(f"Copied {n} objects to {topic_class_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import click
+from dotenv import load_dotenv
+
+from askem.retriever.alias import get_alias, set_alias
+from askem.retriever.base import get_class_names, get_client
+from askem.retriever.migrate import validate_class
+
+load_dotenv()
+
+
+@click.command()
+@click.option("--weaviate-url", help="Weaviate URL.", type=str)
+@click.option("--alias", default="Paragraph", help="`WEAVIATE_CLASS_NAME`.", type=str)
+@click.option("--class-name", help="Class to serve, e.g. Paragraph_v3.", required=True)
+@click.option("--shard-by-topic", is_flag=True, help="Validate each topic class.")
+@click.option("--min-count-ratio", default=0.99, type=float)
+@click.option("--force", is_flag=True, help="Switch even if validation fails.")
+def main(
+    weaviate_url: str | None,
+    alias: str,
+    class_name: str,
+    shard_by_topic: bool,
+    min_count_ratio: float,
+    force: bool,
+) -> None:
+    """Switch the retriever reads of an alias to another class, without downtime.
+
+    The class is validated against the one currently served (object count and
+    search smoke test) first. Retrievers pick the switch up within
+    `WEAVIATE_ALIAS_TTL` seconds. Switch back to the previous class to roll back.
+
+    Usage:
+    # Build the new version while Paragraph_v2 serves, then switch
+    python -m askem.init_class --version 3
+    python -m askem.rebuild_class --class-name Paragraph_v2 --destination Paragraph_v3
+    python -m askem.switch_class --alias Paragraph --class-name Paragraph_v3
+    """
+
+    client = get_client(url=weaviate_url)
+    current = get_alias(client, alias) or alias
+    if current == class_name:
+        click.echo(f"{alias} already points to {class_name}")
+        return
+
+    problems = []
+    for new, old in zip(
+        get_class_names(class_name=class_name, shard_by_topic=shard_by_topic),
+        get_class_names(class_name=current, shard_by_topic=shard_by_topic),
+    ):
+        problems.extend(validate_class(client, new, old, min_count_ratio))
+
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems and not force:
+        raise click.ClickException(f"{class_name} failed validation")
+
+    set_alias(client, alias, class_name)
+    click.echo(f"{alias} now points to {class_name}, previously {current}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,184 +1,245 @@
+import heapq
 import logging
-import re
-import unicodedata
-from typing import Any, List, Optional, Protocol
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Protocol
 
-import spacy
+from askem.blacklist import Blacklist, get_blacklist
+from askem.normalize import normalize, remove_punctuations
 
-# Non-informative in cov
+if TYPE_CHECKING:
+    import spacy
 
+SPACY_MODEL = "en_core_web_sm"
+# Only POS tags are used, `tok2vec`, `tagger` and `attribute_ruler` are kept
+SPACY_DISABLED = ["parser", "ner", "lemmatizer"]
 
-def get_blacklist(topic: str) -> list:
-    BLACKLIST = {"covid": ["COVID19", "COVID-19", "COVID", "SARS-CoV-2", "SARS-CoV"]}
-    try:
-        return BLACKLIST[topic]
-    except KeyError:
-        logging.warning(f"Topic {topic} not found in blacklist.")
-        return []
 
+@lru_cache
+def get_nlp(model: str = SPACY_MODEL) -> "spacy.Language":
+    """Load a spaCy POS pipeline once per process, shared by all strategies."""
+    import spacy  # Only needed by `ProperNounStrategy`
 
-class Strategy(Protocol):
-    """A strategy for extracting terms from a text."""
-
-    def __init__(self, **kwargs: Any) -> None:
-        ...
-
-    def extract_terms(self, text: str, **kwargs) -> Optional[List[str]]:
-        ...
-
-
-def update_count(d: dict, words: Optional[List[str]]) -> None:
-    if not words:
-        return None
-
-    for word in words:
-        if word in d:
-            d[word] += 1
-        else:
-            d[word] = 1
+    return spacy.load(model, disable=SPACY_DISABLED)
 
 
-def get_top_k(d: dict, k: int = 10, min_n: int = 3) -> dict:
-    """Get top-k most frequent words in a dictionary."""
-
-    d = {k: v for k, v in d.items() if v >= min_n}
-    return sorted(d, key=d.get, reverse=True)[:k]
-
-
-def remove_punctuations(text: str, exceptions: Optional[list] = None) -> str:
-    if exceptions is None:
-        exceptions = []
-    return "".join([c for c in text if c.isalnum() or c.isspace() or c in exceptions])
-
+class Strategy(Protocol):
+    """A strategy for extracting terms from a text."""
 
-def remove_line_breaks(text: str) -> str:
-    return text.replace("\n", " ")
+    def __init__(self, **kwargs: Any) -> None: ...
 
+    def extract_terms(self, text: str, **kwargs) -> Optional[List[str]]: ...
 
-def remove_diacritics(text: str) -> str:
-    nfkd_form = unicodedata.normalize("NFKD", text)
-    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    def extract_terms_batch(
+        self, texts: Iterable[str], **kwargs
+    ) -> List[Optional[List[str]]]: ...
 
 
-def remove_brackets(text: str) -> str:
-    return text.replace("(", " ").replace(")", " ")
+def get_top_k(counts: Counter, k: int = 10, min_n: int = 3) -> List[str]:
+    """Get top-k most frequent words occurring at least `min_n` times.
 
+    Ties keep first-seen order, like a stable sort.
+    """
 
-def remove_citations(text: str) -> str:
-    # Remove the text chunks that
-    return re.sub(r"\((?:[A-Za-z‐\s]+(?:et al\.)?, \d{4}(?:; )?)+\)", "", text)
+    items = ((word, n) for word, n in counts.items() if n >= min_n)
+    return [word for word, _ in heapq.nlargest(k, items, key=lambda item: item[1])]
 
 
 class CapitalizedWordsStrategy:
     """Extracts capitalized words from a text."""
 
     def __init__(
-        self, min_length: int, min_occurrence: int, top_k: int, blacklist: list
+        self,
+        min_length: int,
+        min_occurrence: int,
+        top_k: int,
+        blacklist: Blacklist | Iterable[str],
     ) -> None:
         self.min_length = min_length
         self.min_occurrence = min_occurrence
         self.top_k = top_k
+        if not isinstance(blacklist, Blacklist):
+            blacklist = Blacklist(blacklist)
         self.blacklist = blacklist
 
     @staticmethod
     def preprocessing(text: str) -> str:
-        text = remove_line_breaks(text)
-        text = remove_punctuations(text)
-        text = remove_diacritics(text)
-        text = remove_citations(text)
-        return text
+        return normalize(text)
 
-    def extract_terms(self, text: str) -> Optional[List[str]]:
-        text = self.preprocessing(text)
-        logging.info(text)
-
-        terms = [
-            word
-            for word in text.split()
-            if word.isupper()
+    def is_term(self, word: str) -> bool:
+        return (
+            word.isupper()
             and len(word) >= self.min_length
             and word not in self.blacklist
-        ]
+        )
 
-        if not terms:
+    def select(self, counts: Counter) -> Optional[List[str]]:
+        if not counts:
             return None
-
-        counts = {}
-        update_count(counts, terms)
         return get_top_k(counts, k=self.top_k, min_n=self.min_occurrence)
 
-
-class MoreThanOneCapStrategy:
-    def __init__(
-        self, min_length: int, min_occurrence: int, top_k: int, blacklist: list
-    ) -> None:
-        self.min_length = min_length
-        self.min_occurrence = min_occurrence
-        self.top_k = top_k
-        self.blacklist = blacklist
-
-    @staticmethod
-    def preprocessing(text: str) -> str:
-        text = remove_line_breaks(text)
-        text = remove_diacritics(text)
-        text = remove_citations(text)
-        text = remove_punctuations(text, exceptions=["-", "_", "/"])
-        return text
-
     def extract_terms(self, text: str) -> Optional[List[str]]:
         text = self.preprocessing(text)
         logging.info(text)
+        return self.select(Counter(w for w in text.split() if self.is_term(w)))
 
-        terms = []
-        for word in text.split(" "):
-            if len(word) < self.min_length:
-                continue
+    def extract_terms_batch(
+        self, texts: Iterable[str], **kwargs
+    ) -> List[Optional[List[str]]]:
+        return [self.extract_terms(text) for text in texts]
 
-            n_upper = sum(1 for char in word if char.isupper())
-            if n_upper > 1 and word not in self.blacklist:
-                terms.append(word)
 
-        if not terms:
-            return None
+class MoreThanOneCapStrategy(CapitalizedWordsStrategy):
+    """Extracts words with more than one capital letter, e.g. `SARS-CoV`."""
 
-        counts = {}
-        update_count(counts, terms)
-        return get_top_k(counts, k=self.top_k, min_n=self.min_occurrence)
+    @staticmethod
+    def preprocessing(text: str) -> str:
+        return normalize(text, exceptions=["-", "_", "/"])
 
+    def is_term(self, word: str) -> bool:
+        if len(word) < self.min_length:
+            return False
+        n_upper = sum(1 for char in word if char.isupper())
+        return n_upper > 1 and word not in self.blacklist
+
+
+class ProperNounStrategy(CapitalizedWordsStrategy):
+    """Extracts proper nouns tagged by spaCy."""
 
-class ProperNounStrategy:
     def __init__(
-        self, min_length: int, min_occurrence: int, top_k: int, blacklist: list
+        self,
+        min_length: int,
+        min_occurrence: int,
+        top_k: int,
+        blacklist: Blacklist | Iterable[str],
     ) -> None:
-        self.min_length = min_length
-        self.min_occurrence = min_occurrence
-        self.top_k = top_k
-        self.blacklist = blacklist
-        self.nlp = spacy.load("en_core_web_sm")
+        super().__init__(min_length, min_occurrence, top_k, blacklist)
+        self.nlp = get_nlp()
 
     @staticmethod
     def preprocessing(text: str) -> str:
-        text = remove_line_breaks(text)
-        text = remove_diacritics(text)
-        text = remove_citations(text)
-        return text
+        return normalize(text, punctuation=False)
+
+    def is_term(self, token: "spacy.tokens.Token") -> bool:
+        return (
+            token.pos_ == "PROPN"
+            and len(token.text) >= self.min_length
+            and token.text not in self.blacklist
+        )
+
+    def count_terms(self, doc: "spacy.tokens.Doc") -> Counter:
+        return Counter(token.text for token in doc if self.is_term(token))
 
     def extract_terms(self, text: str) -> Optional[List[str]]:
         text = self.preprocessing(text)
         logging.info(text)
+        return self.select(self.count_terms(self.nlp(text)))
 
-        terms = []
-        for token in self.nlp(text):
-            if (
-                token.pos_ == "PROPN"
-                and len(token.text) >= self.min_length
-                and token.text not in self.blacklist
-            ):
-                terms.append(token.text)
+    def extract_terms_batch(
+        self, texts: Iterable[str], batch_size: int = 256, n_process: int = 1
+    ) -> List[Optional[List[str]]]:
+        """Extract terms of many texts with `nlp.pipe`, optionally multi-process."""
 
-        if not terms:
-            return None
+        texts = (self.preprocessing(text) for text in texts)
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [self.select(self.count_terms(doc)) for doc in docs]
 
-        counts = {}
-        update_count(counts, terms)
-        return get_top_k(counts, k=self.top_k, min_n=self.min_occurrence)
+
+STRATEGIES = {
+    "capitalized": CapitalizedWordsStrategy,
+    "more_than_one_cap": MoreThanOneCapStrategy,
+    "proper_noun": ProperNounStrategy,
+}
+
+# Characters kept by `MoreThanOneCapStrategy` but removed by `CapitalizedWordsStrategy`
+WORD_SEPARATORS = str.maketrans("", "", "-_/")
+
+
+class MultiStrategyExtractor:
+    """Run several strategies in a single pass over shared token streams.
+
+    The text is normalized once (line breaks, diacritics, citations), spaCy tags it
+    once for `proper_noun`, and one word stream feeds the capitalization strategies.
+    The results are the same as running each strategy on its own.
+    """
+
+    def __init__(
+        self,
+        min_length: int,
+        min_occurrence: int,
+        top_k: int,
+        blacklist: Blacklist | Iterable[str],
+        strategies: Iterable[str] = tuple(STRATEGIES),
+    ) -> None:
+        if not isinstance(blacklist, Blacklist):
+            blacklist = Blacklist(blacklist)  # Shared by all strategies
+        self.strategies = {
+            name: STRATEGIES[name](min_length, min_occurrence, top_k, blacklist)
+            for name in strategies
+        }
+
+    def _extract(
+        self, text: str, doc: Optional["spacy.tokens.Doc"] = None
+    ) -> dict[str, Optional[List[str]]]:
+        counts = {name: Counter() for name in self.strategies}
+        capitalized = self.strategies.get("capitalized")
+        more_than_one_cap = self.strategies.get("more_than_one_cap")
+
+        if capitalized or more_than_one_cap:
+            for word in remove_punctuations(text, exceptions="-_/").split():
+                if more_than_one_cap and more_than_one_cap.is_term(word):
+                    counts["more_than_one_cap"][word] += 1
+                if capitalized:
+                    word = word.translate(WORD_SEPARATORS)
+                    if word and capitalized.is_term(word):
+                        counts["capitalized"][word] += 1
+
+        if doc is not None:
+            counts["proper_noun"] = self.strategies["proper_noun"].count_terms(doc)
+
+        return {
+            name: strategy.select(counts[name])
+            for name, strategy in self.strategies.items()
+        }
+
+    def extract_terms(self, text: str) -> dict[str, Optional[List[str]]]:
+        """Extract terms of every strategy, keyed by strategy name."""
+        return self.extract_terms_batch([text])[0]
+
+    def extract_terms_batch(
+        self, texts: Iterable[str], batch_size: int = 256, n_process: int = 1
+    ) -> List[dict[str, Optional[List[str]]]]:
+        """Extract terms of many texts, tagging them with `nlp.pipe` if needed."""
+
+        texts = [normalize(text, punctuation=False) for text in texts]
+        if "proper_noun" not in self.strategies:
+            return [self._extract(text) for text in texts]
+
+        nlp = self.strategies["proper_noun"].nlp
+        docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [self._extract(text, doc) for text, doc in zip(texts, docs)]
+
+
+# Acronyms and capitalized terms of `paragraph_terms`, no spaCy model needed. Shared
+# by ingest and `askem.extract_terms`, so the retriever's terms filter matches alike.
+PARAGRAPH_TERMS_STRATEGIES = ("capitalized", "more_than_one_cap")
+
+
+def extract_paragraph_terms(
+    texts: List[str], topics: Iterable[str], top_k: int = 10
+) -> List[List[str]]:
+    """Key terms of each paragraph, stored in the `paragraph_terms` property."""
+
+    blacklist = get_blacklist(*topics)
+    extractor = MultiStrategyExtractor(
+        min_length=3,
+        min_occurrence=1,
+        top_k=top_k,
+        blacklist=blacklist,
+        strategies=PARAGRAPH_TERMS_STRATEGIES,
+    )
+    return [
+        list(dict.fromkeys(chain.from_iterable(filter(None, terms.values()))))
+        for terms in extractor.extract_terms_batch(texts)
+    ]
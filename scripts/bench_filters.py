@@ -0,0 +1,124 @@
+"""Benchmark filtered vector search latency of classes, e.g. before/after a rebuild.
+
+Each filter of `get_documents` is timed alone and combined, on the same questions,
+for every class.
+
+Usage:
+    PYTHONPATH=.:askem/retriever python scripts/bench_filters.py \
+        --class-names Paragraph,Paragraph_v2 --topic xdd-covid-19 --repeat 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from askem.retriever.base import get_client
+from askem.utils import get_batch_with_cursor
+
+QUESTIONS = [
+    "What is the incubation period of COVID-19?",
+    "What is SIDARTHE model?",
+    "How do dolomites form?",
+    "What are the projected sea level changes by 2100?",
+    "Where are critical minerals deposits located?",
+]
+
+
+def sample_paper_ids(client, class_name: str, n: int) -> list[str]:
+    """Distinct paper ids of the first objects of a class."""
+
+    paper_ids = set()
+    cursor = None
+    while len(paper_ids) < n:
+        response = get_batch_with_cursor(client, class_name, ["paper_id"], 1000, cursor)
+        data = response["data"]["Get"][class_name]
+        if not data:
+            break
+        paper_ids.update(x["paper_id"] for x in data)
+        cursor = data[-1]["_additional"]["id"]
+    return sorted(paper_ids)[:n]
+
+
+def get_filters(topic: str, preprocessor_id: str, paper_ids: list[str]) -> dict:
+    """Where filters of `get_documents`, by name."""
+
+    operands = {
+        "topic": {
+            "path": ["topic_list"],
+            "operator": "ContainsAny",
+            "valueText": [topic],
+        },
+        "doc_type": {
+            "path": ["doc_type"],
+            "operator": "Equal",
+            "valueText": "paragraph",
+        },
+        "preprocessor_id": {
+            "path": ["preprocessor_id"],
+            "operator": "Equal",
+            "valueText": preprocessor_id,
+        },
+        f"{len(paper_ids)} paper_ids": {
+            "path": ["paper_id"],
+            "operator": "ContainsAny",
+            "valueText": paper_ids,
+        },
+    }
+    filters = {"none": None, **operands}
+    filters["all"] = {"operator": "And", "operands": list(operands.values())}
+    return filters
+
+
+def bench(client, class_name: str, where: dict | None, top_k: int, repeat: int):
+    """Latencies in milliseconds, and the number of results of the last query."""
+
+    latencies = []
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            query = (
+                client.query.get(class_name, ["paper_id"])
+                .with_near_text({"concepts": [question]})
+                .with_limit(top_k)
+            )
+            if where is not None:
+                query = query.with_where(where)
+
+            start = time.perf_counter()
+            response = query.do()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            if "errors" in response:
+                raise RuntimeError(response["errors"])
+    return np.array(latencies), len(response["data"]["Get"][class_name])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weaviate-url", type=str)
+    parser.add_argument("--class-names", default="Paragraph", type=str)
+    parser.add_argument("--topic", default="xdd-covid-19", type=str)
+    parser.add_argument("--preprocessor-id", default="haystack_v0.0.2", type=str)
+    parser.add_argument("--n-paper-ids", default=1000, type=int)
+    parser.add_argument("--top-k", default=5, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = get_client(url=args.weaviate_url)
+    class_names = args.class_names.split(",")
+
+    paper_ids = sample_paper_ids(client, class_names[0], args.n_paper_ids)
+    filters = get_filters(args.topic, args.preprocessor_id, paper_ids)
+
+    print(f"{'class':>20} {'filter':>16} {'n':>3} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, where in filters.items():
+        for class_name in class_names:
+            latencies, n = bench(client, class_name, where, args.top_k, args.repeat)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{class_name:>20} {name:>16} {n:>3} {p50:>7.1f} {p95:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
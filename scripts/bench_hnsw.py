@@ -0,0 +1,139 @@
+"""Sweep HNSW index profiles and `ef` for recall against latency.
+
+A sample of the class's vectors is indexed into a scratch class per profile. Held
+out vectors of the same sample are the queries, their exact top-k (dot product) is
+the ground truth.
+
+Usage:
+    PYTHONPATH=.:askem/retriever python scripts/bench_hnsw.py --class-name Paragraph \
+        --n-objects 50000 --profiles default,recall,pq --ef 16,32,64,128,256
+"""
+
+import argparse
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from askem.retriever.base import (
+    COMPRESSIONS,
+    get_client,
+    get_supported_profiles,
+    get_vector_index_config,
+)
+from askem.retriever.migrate import get_batch_with_cursor
+
+BENCH_CLASS_NAME = "HnswBench"
+
+
+def sample_vectors(client, class_name: str, n: int, batch_size: int = 1000):
+    """First `n` vectors of a class, in cursor order."""
+
+    vectors = []
+    cursor = None
+    while len(vectors) < n:
+        response = get_batch_with_cursor(
+            client, class_name, ["paper_id"], min(batch_size, n - len(vectors)), cursor
+        )
+        data = response["data"]["Get"][class_name]
+        if not data:
+            break
+        vectors.extend(x["_additional"]["vector"] for x in data)
+        cursor = data[-1]["_additional"]["id"]
+    return np.array(vectors, dtype=np.float32)
+
+
+def build_index(client, profile: str, corpus: np.ndarray) -> None:
+    """Index `corpus` into the scratch class, compressing once the data is in."""
+
+    config = get_vector_index_config(profile)
+    compression = {k: config.pop(k) for k in COMPRESSIONS if k in config}
+
+    if client.schema.exists(BENCH_CLASS_NAME):
+        client.schema.delete_class(BENCH_CLASS_NAME)
+    client.schema.create_class(
+        {
+            "class": BENCH_CLASS_NAME,
+            "vectorizer": "none",
+            "vectorIndexConfig": config,
+            "properties": [{"name": "index", "dataType": ["int"]}],
+        }
+    )
+
+    client.batch.configure(batch_size=200, dynamic=True)
+    with client.batch as batch:
+        for i, vector in enumerate(corpus):
+            batch.add_data_object({"index": i}, BENCH_CLASS_NAME, vector=vector)
+
+    # Quantization is trained on the imported vectors
+    if compression:
+        client.schema.update_config(
+            BENCH_CLASS_NAME, {"vectorIndexConfig": compression}
+        )
+
+
+def run_queries(client, queries: np.ndarray, top_k: int):
+    """Indices of the top-k of each query, and per query latencies in seconds."""
+
+    results = []
+    latencies = []
+    for vector in queries:
+        start = time.perf_counter()
+        response = (
+            client.query.get(BENCH_CLASS_NAME, ["index"])
+            .with_near_vector({"vector": vector.tolist()})
+            .with_limit(top_k)
+            .do()
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append([x["index"] for x in response["data"]["Get"][BENCH_CLASS_NAME]])
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weaviate-url", type=str)
+    parser.add_argument("--class-name", default="Paragraph", type=str)
+    parser.add_argument("--n-objects", default=20000, type=int)
+    parser.add_argument("--n-queries", default=200, type=int)
+    parser.add_argument("--top-k", default=10, type=int)
+    parser.add_argument(
+        "--profiles", type=str, help="Defaults to all profiles the server supports."
+    )
+    parser.add_argument("--ef", default="16,32,64,128,256", type=str)
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = get_client(url=args.weaviate_url)
+    server_version = client.get_meta()["version"]
+    supported = get_supported_profiles(server_version)
+    profiles = args.profiles.split(",") if args.profiles else supported
+    if unsupported := set(profiles) - set(supported):
+        parser.error(f"{unsupported} not supported by weaviate {server_version}")
+
+    vectors = sample_vectors(client, args.class_name, args.n_objects + args.n_queries)
+    corpus, queries = vectors[: -args.n_queries], vectors[-args.n_queries :]
+    exact = np.argsort(-queries @ corpus.T, axis=1)[:, : args.top_k]
+    print(f"{len(corpus)} vectors, {len(queries)} queries, recall@{args.top_k}")
+
+    print(f"{'profile':>10} {'ef':>5} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    try:
+        for profile in profiles:
+            build_index(client, profile, corpus)
+            for ef in map(int, args.ef.split(",")):
+                client.schema.update_config(
+                    BENCH_CLASS_NAME, {"vectorIndexConfig": {"ef": ef}}
+                )
+                results, latencies = run_queries(client, queries, args.top_k)
+                recall = np.mean(
+                    [len(set(r) & set(e)) / args.top_k for r, e in zip(results, exact)]
+                )
+                p50, p95 = np.percentile(latencies * 1000, [50, 95])
+                print(f"{profile:>10} {ef:>5} {recall:>7.3f} {p50:>7.1f} {p95:>7.1f}")
+    finally:
+        if client.schema.exists(BENCH_CLASS_NAME):
+            client.schema.delete_class(BENCH_CLASS_NAME)
+
+
+if __name__ == "__main__":
+    main()
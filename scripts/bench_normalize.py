@@ -0,0 +1,70 @@
+"""Benchmark `askem.normalize` against the previous character-by-character helpers.
+
+Usage:
+    python scripts/bench_normalize.py --input-dir data/debug_data --repeat 20
+"""
+
+import argparse
+import re
+import time
+import unicodedata
+from pathlib import Path
+
+from askem.normalize import normalize
+
+
+# Previous implementations, kept here as the baseline
+def remove_punctuations(text: str, exceptions: list | None = None) -> str:
+    if exceptions is None:
+        exceptions = []
+    return "".join([c for c in text if c.isalnum() or c.isspace() or c in exceptions])
+
+
+def remove_diacritics(text: str) -> str:
+    nfkd_form = unicodedata.normalize("NFKD", text)
+    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+
+
+def remove_citations(text: str) -> str:
+    return re.sub(r"\((?:[A-Za-z‐\s]+(?:et al\.)?, \d{4}(?:; )?)+\)", "", text)
+
+
+def baseline(text: str) -> str:
+    """`MoreThanOneCapStrategy.preprocessing` before the fused pipeline."""
+    text = text.replace("\n", " ")
+    text = remove_diacritics(text)
+    text = remove_citations(text)
+    return remove_punctuations(text, exceptions=["-", "_", "/"])
+
+
+def fused(text: str) -> str:
+    return normalize(text, exceptions=["-", "_", "/"])
+
+
+def bench(fn, texts: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text normalization.")
+    parser.add_argument("--input-dir", type=str, default="data/debug_data")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = [p.read_text() for p in sorted(Path(args.input_dir).glob("*.txt"))]
+    n_chars = sum(len(text) for text in texts) * args.repeat
+
+    mismatches = sum(baseline(text) != fused(text) for text in texts)
+    print(f"{len(texts)} files, {mismatches} outputs differ from the baseline")
+
+    for name, fn in [("Baseline", baseline), ("Fused", fused)]:
+        seconds = bench(fn, texts, args.repeat)
+        print(f"{name:<9} {n_chars / seconds / 1e6:6.1f} M chars/sec ({seconds:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import base64
+import json
+
 import pytest
 
 
@@ -18,6 +21,87 @@ def test_vector_search(test_client):
     assert len(response.json()) <= 5
 
 
+def test_vector_search_fields(test_client):
+    query = {
+        "topic": "covid",
+        "question": "What is the incubation period of COVID-19?",
+        "top_k": 5,
+        "fields": ["paper_id", "distance"],
+    }
+    response = test_client.post("/vector", json=query)
+    assert response.status_code == 200
+    for document in response.json():
+        assert set(document) == {"paper_id", "distance"}
+
+
+def test_vector_pages(test_client):
+    query = {
+        "topic": "covid",
+        "question": "What is the incubation period of COVID-19?",
+        "top_k": 25,
+        "page_size": 10,
+    }
+    with test_client.stream("POST", "/vector_pages", json=query) as response:
+        assert response.status_code == 200
+        pages = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert sum(len(page["documents"]) for page in pages) <= 25
+    distances = [doc["distance"] for page in pages for doc in page["documents"]]
+    assert distances == sorted(distances)
+
+
+def encode_state(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_state({"search": {"question": "COVID?"}}),  # Missing offset
+        encode_state({"search": {"question": "COVID?", "top_k": "x"}, "offset": 0}),
+        encode_state({"search": {"question": "COVID?", "rerank": True}, "offset": 0}),
+        encode_state({"search": {"cursor": "x"}, "offset": 0}),
+    ],
+)
+def test_vector_pages_invalid_cursor(test_client, cursor):
+    response = test_client.post("/vector_pages", json={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_vector_pages_offset_beyond_maximum(test_client):
+    query = {"question": "What is COVID?", "offset": 10_000}
+    response = test_client.post("/vector_pages", json=query)
+    assert response.status_code == 400
+
+
+def test_pages_end_at_query_maximum(monkeypatch):
+    import pagination
+    from data_models import Document
+
+    monkeypatch.setattr(pagination, "QUERY_MAXIMUM_RESULTS", 25)
+    limits = []
+
+    def search(question: str, top_k: int, offset: int) -> list[Document]:
+        assert offset + top_k <= 25
+        limits.append(top_k)
+        return [
+            Document(
+                paper_id=str(i),
+                preprocessor_id="test",
+                doc_type="paragraph",
+                topic_list=[],
+                text_content="text",
+                distance=i / 100,
+            )
+            for i in range(offset, offset + top_k)
+        ]
+
+    pages = list(pagination.iter_pages(search, {"question": "COVID?"}, page_size=10))
+    assert limits == [10, 10, 5]
+    assert [cursor is None for _, cursor in pages] == [False, False, True]
+
+
 def test_hybrid_search(test_client):
     query = {
         "topic": "covid",
@@ -58,3 +142,28 @@ async def test_react_search_streaming(async_test_client):
     }
     response = await async_test_client.post("/react_streaming", json=query)
     assert response.status_code == 200
+
+
+def test_react_search_sse(test_client):
+    query = {
+        "question": "What is the incubation period of COVID-19?",
+        "top_k": 5,
+        "topic": "covid",
+        "screening_top_k": 1000,
+    }
+    headers = {"Accept": "text/event-stream"}
+    with test_client.stream(
+        "POST", "/react_streaming", json=query, headers=headers
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [line for line in response.iter_lines() if line.startswith("event:")]
+
+    assert "event: answer" in events
+
+
+@pytest.mark.parametrize("ef", [0, 1025])
+def test_vector_search_ef_bounds(test_client, ef):
+    query = {"question": "What is COVID?", "ef": ef}
+    response = test_client.post("/vector", json=query)
+    assert response.status_code == 422
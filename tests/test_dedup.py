@@ -0,0 +1,29 @@
+from askem.retriever.dedup import collapse_duplicates, estimate_jaccard, get_minhash
+
+TEXT = (
+    "The incubation period of COVID-19 is estimated to be between two and fourteen "
+    "days, with a median of around five days after exposure to the virus."
+)
+
+
+def test_minhash_identical_text():
+    assert estimate_jaccard(get_minhash(TEXT), get_minhash(TEXT)) == 1.0
+
+
+def test_minhash_distinct_text():
+    other = (
+        "Dolomite formation requires specific geochemical conditions in marine basins."
+    )
+    assert estimate_jaccard(get_minhash(TEXT), get_minhash(other)) < 0.2
+
+
+def test_collapse_duplicates():
+    results = [
+        {"paper_id": "a", "hashed_text": "1", "text_content": TEXT},
+        {"paper_id": "b", "hashed_text": "1", "text_content": TEXT},
+        {"paper_id": "c", "hashed_text": "2", "text_content": TEXT + " Overlap."},
+        {"paper_id": "a", "hashed_text": "3", "text_content": "Unrelated geology."},
+        {"paper_id": "a", "hashed_text": "4", "text_content": "Another paragraph."},
+    ]
+    collapsed = collapse_duplicates(results, top_k=5, max_per_paper=2)
+    assert [r["hashed_text"] for r in collapsed] == ["1", "3"]
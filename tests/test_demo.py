@@ -0,0 +1,38 @@
+import sys
+
+import httpx
+import pytest
+
+sys.path.append("askem/demo")
+
+import connector  # noqa: E402
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Clients built by `get_client`, answering react streams from a mock transport."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        content = b'{"thoughts": "..."}\n\n{"answer": "42"}\n'
+        return httpx.Response(200, content=content)
+
+    clients = []
+
+    def get_mock_client(**kwargs) -> httpx.Client:
+        clients.append(httpx.Client(transport=httpx.MockTransport(handler), **kwargs))
+        return clients[-1]
+
+    monkeypatch.setenv("RETRIEVER_URL", "http://retriever")
+    monkeypatch.setattr(connector, "Client", get_mock_client)
+    connector.get_client.cache_clear()
+    yield clients
+    connector.get_client.cache_clear()
+
+
+def test_questions_reuse_client(clients):
+    for question in ["What is COVID-19?", "What is a dolomite?"]:
+        chunks = list(connector.query_react(question, "covid", 3, "gpt-4"))
+        assert chunks == [{"thoughts": "..."}, {"answer": "42"}]
+
+    assert len(clients) == 1
+    assert not clients[0].is_closed
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+
+from askem.retriever.migrate import StoredObject
+
+pytest.importorskip("click")
+pytest.importorskip("tqdm")
+
+from click.testing import CliRunner  # noqa: E402
+
+import askem.extract_terms as extract_terms  # noqa: E402
+
+TEXT = "The SEIRD model extends SEIR. SEIRD and SARS-CoV-2 were fit to the data."
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Objects written by `extract_terms`, reading one paragraph and its paper."""
+
+    paragraph = StoredObject(
+        uuid="paragraph-uuid",
+        properties={
+            "paper_id": "paper-1",
+            "topic_list": ["xdd-covid-19"],
+            "text_content": TEXT,
+        },
+        vector=[0.1, 0.2],
+        paper_uuids=["paper-uuid"],
+    )
+    paper = StoredObject(
+        uuid="paper-uuid", properties={"paper_id": "paper-1"}, vector=[], paper_uuids=[]
+    )
+
+    def iter_objects(client, class_name, paper_class_name="Paper", batch_size=1000):
+        yield [paragraph] if class_name == "Paragraph" else [paper]
+
+    written = []
+    writer = SimpleNamespace(
+        add_object=lambda properties, class_name, **kwargs: written.append(
+            (class_name, properties)
+        ),
+        add_reference=lambda **kwargs: None,
+        close=lambda: None,
+    )
+    monkeypatch.setattr(extract_terms, "get_client", lambda url=None: None)
+    monkeypatch.setattr(extract_terms, "ensure_property", lambda *args: None)
+    monkeypatch.setattr(extract_terms, "iter_objects", iter_objects)
+    monkeypatch.setattr(extract_terms, "BatchWriter", lambda *args, **kwargs: writer)
+    return written
+
+
+def test_extract_terms_without_topic_paragraphs(written):
+    result = CliRunner().invoke(extract_terms.main, ["--topic", "dolomites"])
+    assert result.exit_code != 0
+    assert "No Paragraph objects in topic dolomites" in result.output
+    assert written == []
+
+
+def test_extract_terms_topic_alias(written):
+    result = CliRunner().invoke(extract_terms.main, ["--topic", "covid"])
+    assert result.exit_code == 0, result.output
+
+    (paragraph_class, paragraph), (paper_class, paper) = written
+    assert paragraph_class == "Paragraph"
+    assert "SEIRD" in paragraph["paragraph_terms"]
+    assert paper_class == "Paper"
+    assert "SEIRD" in paper["terms"]
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+sys.path.append("askem/generator")
+
+from batching import MicroBatcher  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"  # The batcher is built on asyncio queues
+
+
+def double(items: List[int]) -> List[int]:
+    return [item * 2 for item in items]
+
+
+@pytest.mark.anyio
+async def test_batcher_batches_concurrent_requests():
+    batch_sizes = []
+
+    def fn(items):
+        batch_sizes.append(len(items))
+        return double(items)
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait=0.05)
+    batcher.start()
+    try:
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+    finally:
+        await batcher.stop()
+
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert batch_sizes == [4, 2]
+
+
+@pytest.mark.anyio
+async def test_batcher_rejects_when_full():
+    batcher = MicroBatcher(double, max_queue_size=4)
+
+    # Not started yet, queued inputs wait
+    queued = asyncio.create_task(batcher.submit_many([1, 2, 3]))
+    await asyncio.sleep(0)
+    with pytest.raises(asyncio.QueueFull):
+        await batcher.submit_many([4, 5])
+    assert batcher.metrics.n_rejected == 2
+
+    batcher.start()
+    try:
+        assert await queued == [2, 4, 6]
+        assert await batcher.submit_many([4, 5]) == [8, 10]
+    finally:
+        await batcher.stop()
+
+
+@pytest.mark.anyio
+async def test_batcher_rejects_batches_larger_than_queue():
+    batcher = MicroBatcher(double, max_queue_size=4)
+    with pytest.raises(ValueError):
+        await batcher.submit_many([1, 2, 3, 4, 5])
+    assert batcher.queue.empty()
+
+
+def get_tokenizer(n_special_tokens: int = 3):
+    return SimpleNamespace(num_special_tokens_to_add=lambda pair: n_special_tokens)
+
+
+def test_windows_cover_passage():
+    windowing = pytest.importorskip("windowing")  # Requires torch
+
+    question_ids = [0] * 10
+    windows = windowing.get_windows(
+        get_tokenizer(), question_ids, list(range(100)), max_seq_len=43, doc_stride=10
+    )
+
+    # 30 passage tokens per window, overlapping by 10
+    assert windows == [(0, 30), (20, 50), (40, 70), (60, 90), (80, 100)]
+
+
+def test_windows_short_passage():
+    windowing = pytest.importorskip("windowing")
+
+    assert windowing.get_windows(get_tokenizer(), [0], [], max_seq_len=16) == [(0, 0)]
+    with pytest.raises(ValueError):
+        windowing.get_windows(get_tokenizer(), [0] * 16, [1], max_seq_len=16)
@@ -0,0 +1,38 @@
+import unicodedata
+
+from askem.normalize import normalize, remove_diacritics, remove_punctuations
+
+TEXT = (
+    "Café “naïve” résumé — SARS-CoV-2_variant/B.1 ﬁnds ½ of\ncases "
+    "(Smith et al., 2020; Doe, 2021) in Zürich, α-β ok!"
+)
+
+
+def reference_punctuations(text: str, exceptions: list) -> str:
+    return "".join(c for c in text if c.isalnum() or c.isspace() or c in exceptions)
+
+
+def reference_diacritics(text: str) -> str:
+    nfkd_form = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in nfkd_form if not unicodedata.combining(c))
+
+
+def test_remove_punctuations_matches_reference():
+    for exceptions in [[], ["-", "_", "/"], ["—"]]:
+        assert remove_punctuations(TEXT, exceptions) == reference_punctuations(
+            TEXT, exceptions
+        )
+
+
+def test_remove_diacritics_matches_reference():
+    assert remove_diacritics(TEXT) == reference_diacritics(TEXT)
+    assert remove_diacritics("plain ascii") == "plain ascii"
+
+
+def test_normalize():
+    text = normalize(TEXT, exceptions=["-", "_", "/"])
+    assert "Smith" not in text
+    assert "\n" not in text
+    assert "SARS-CoV-2_variant/B1" in text
+    assert "Cafe naive resume" in text
+    assert normalize(TEXT, punctuation=False, citations=False).count("(") == 1
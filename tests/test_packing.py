@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import packing
+import pytest
+from data_models import Document
+
+MODEL_NAME = "test-model"
+
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    """One token per word, without downloading a tiktoken encoding."""
+    encoding = SimpleNamespace(
+        encode=lambda text, disallowed_special: text.split(),
+        decode=lambda tokens: " ".join(tokens),
+    )
+    monkeypatch.setattr(packing, "get_encoding", lambda model_name: encoding)
+    packing.count_tokens.cache_clear()
+
+
+def get_document(text: str) -> Document:
+    return Document(
+        paper_id="paper",
+        preprocessor_id="test",
+        doc_type="paragraph",
+        topic_list=[],
+        text_content=text,
+    )
+
+
+def test_pack_within_budget():
+    packer = packing.ContextPacker(MODEL_NAME, step_token_budget=5)
+    documents = [get_document("a b c"), get_document("d e f"), get_document("g h")]
+
+    packed, output = packer.pack(documents)
+    assert packed == [documents[0], documents[2]]
+    assert output == "a b c\n\ng h"
+    assert packer.saved_tokens == 3
+
+    # Already packed documents are skipped
+    packed, output = packer.pack(documents[:1])
+    assert packed == [] and output == ""
+
+
+def test_pack_truncates_oversize_top_document():
+    packer = packing.ContextPacker(MODEL_NAME, step_token_budget=3)
+    documents = [get_document("a b c d e"), get_document("f g h i")]
+
+    packed, output = packer.pack(documents)
+    assert packed == [documents[0]]
+    assert output == "a b c"
+    assert packer.used_tokens == 3
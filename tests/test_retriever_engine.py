@@ -1,4 +1,18 @@
-from askem.retriever.base import get_documents
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import askem.retriever.base as base
+from askem.retriever.alias import AliasResolver
+from askem.retriever.base import (
+    attach_context,
+    get_class_names,
+    get_documents,
+    get_supported_profiles,
+    has_property,
+    to_document,
+)
 
 
 def test_get_doc_base(weaviate_client):
@@ -71,3 +85,225 @@ def test_get_doc_move_away(weaviate_client):
         move_away_from="mathematical model",
         move_away_from_weight=0.5,
     )
+
+
+def test_get_doc_dedup(weaviate_client):
+    documents = get_documents(
+        client=weaviate_client,
+        question="What is the incubation period of COVID-19?",
+        top_k=10,
+        dedup=True,
+        max_per_paper=2,
+    )
+    assert len({doc.hashed_text for doc in documents}) == len(documents)
+
+
+def test_get_doc_context_window(weaviate_client):
+    documents = get_documents(
+        client=weaviate_client,
+        question="What is the incubation period of COVID-19?",
+        doc_type="paragraph",
+        context_window=1,
+    )
+    for doc in documents:
+        assert len(doc.context) <= 2
+        for neighbor in doc.context:
+            assert abs(neighbor.paragraph_order - doc.paragraph_order) == 1
+
+
+def test_get_doc_rerank(weaviate_client):
+    documents = get_documents(
+        client=weaviate_client,
+        question="What is the incubation period of COVID-19?",
+        rerank=True,
+    )
+    scores = [doc.rerank_score for doc in documents]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_get_doc_metadata(weaviate_client):
+    documents = get_documents(
+        client=weaviate_client,
+        question="What is the incubation period of COVID-19?",
+        include_metadata=True,
+    )
+    papers = [doc.paper for doc in documents if doc.paper is not None]
+    assert papers
+    for paper in papers:
+        assert paper.title
+        assert paper.url
+
+
+def test_class_names_shared():
+    assert get_class_names("covid", "Paragraph", shard_by_topic=False) == ["Paragraph"]
+
+
+def test_class_names_by_topic():
+    assert get_class_names("covid", "Paragraph", shard_by_topic=True) == [
+        "Paragraph_xdd_covid_19"
+    ]
+    assert len(get_class_names(None, "Paragraph", shard_by_topic=True)) == 5
+
+
+def get_alias_client(aliases: dict[str, str]):
+    """Stub client serving class aliases from a dict."""
+
+    def get_by_id(uuid, class_name):
+        return {"properties": {"class_name": aliases["Paragraph"]}} if aliases else None
+
+    return SimpleNamespace(
+        schema=SimpleNamespace(exists=lambda name: True),
+        data_object=SimpleNamespace(get_by_id=get_by_id),
+    )
+
+
+def test_alias_resolver():
+    aliases = {}
+    client = get_alias_client(aliases)
+    assert AliasResolver().resolve(client, "Paragraph") == "Paragraph"
+
+    aliases["Paragraph"] = "Paragraph_v2"
+    resolver = AliasResolver(ttl=60)
+    assert resolver.resolve(client, "Paragraph") == "Paragraph_v2"
+
+    # Switches are picked up after the TTL only
+    aliases["Paragraph"] = "Paragraph_v3"
+    assert resolver.resolve(client, "Paragraph") == "Paragraph_v2"
+    assert AliasResolver(ttl=0).resolve(client, "Paragraph") == "Paragraph_v3"
+
+
+def test_has_property():
+    schemas = {
+        "Paragraph_v1": {"properties": [{"name": "text_content"}]},
+        "Paragraph_v2": {
+            "properties": [{"name": "text_content"}, {"name": "text_minhash"}]
+        },
+    }
+    client = SimpleNamespace(schema=SimpleNamespace(get=schemas.get))
+    assert has_property(client, ["Paragraph_v2"], "text_minhash")
+    assert not has_property(client, ["Paragraph_v1", "Paragraph_v2"], "text_minhash")
+
+
+class StubQuery:
+    """Get query builder serving the stored rows of a class, honoring limit and offset."""
+
+    def __init__(self, class_name: str, rows: list[dict]) -> None:
+        self.class_name = class_name
+        self.rows = rows
+        self.limit = len(rows)
+        self.offset = 0
+
+    def __getattr__(self, name: str):
+        # Filters, near text and aliases are ignored
+        return lambda *args, **kwargs: self
+
+    def with_limit(self, limit: int) -> "StubQuery":
+        self.limit = limit
+        return self
+
+    def with_offset(self, offset: int) -> "StubQuery":
+        self.offset = offset
+        return self
+
+    def get(self) -> list[dict]:
+        return self.rows[self.offset : self.offset + self.limit]
+
+    def do(self) -> dict:
+        return {"data": {"Get": {self.class_name: self.get()}}}
+
+
+def get_stub_client(rows: dict[str, list[dict]], properties: list[str] = ()):
+    """Stub client serving `Get` queries from rows keyed by class name.
+
+    All classes have `properties`, no alias is set, and the requested fields are
+    recorded in `fields`.
+    """
+
+    fields = []
+
+    def get(class_name, output_fields):
+        fields.extend(output_fields)
+        return StubQuery(class_name, rows[class_name])
+
+    def multi_get(queries):
+        data = {query.class_name: query.get() for query in queries}
+        return SimpleNamespace(do=lambda: {"data": {"Get": data}})
+
+    schema = {"properties": [{"name": name} for name in properties]}
+    return SimpleNamespace(
+        query=SimpleNamespace(get=get, multi_get=multi_get),
+        schema=SimpleNamespace(exists=lambda name: False, get=lambda name: schema),
+        fields=fields,
+    )
+
+
+def get_row(paragraph_order: int, **kwargs) -> dict:
+    return {
+        "paper_id": "paper",
+        "preprocessor_id": "haystack_v0.0.2",
+        "doc_type": "paragraph",
+        "topic_list": ["covid"],
+        "cosmos_object_id": None,
+        "text_content": f"Paragraph {paragraph_order}",
+        "hashed_text": str(paragraph_order),
+        "paragraph_order": paragraph_order,
+        **kwargs,
+    }
+
+
+def test_attach_context_pages_past_duplicates():
+    # Copies of the document itself fill the first page
+    rows = [get_row(1)] * 5 + [get_row(0), get_row(2)]
+    client = get_stub_client({"Paragraph": rows})
+    document = to_document(get_row(1))
+
+    attach_context(client, [document], 1, [], ["Paragraph"])
+    assert [doc.paragraph_order for doc in document.context] == [0, 2]
+
+
+def test_get_doc_metadata_without_paper_reference(monkeypatch):
+    # Class created before the `paper` reference
+    monkeypatch.setattr(base, "WEAVIATE_CLASS_NAME", "Paragraph_v1")
+    rows = [get_row(0, _additional={"distance": 0.1})]
+    client = get_stub_client({"Paragraph_v1": rows}, properties=["text_content"])
+
+    documents = get_documents(client, "What is COVID?", include_metadata=True)
+    assert documents[0].paper is None
+    assert not any(field.startswith("paper {") for field in client.fields)
+
+
+def test_get_doc_term_without_paragraph_terms(monkeypatch):
+    monkeypatch.setattr(base, "WEAVIATE_CLASS_NAME", "Paragraph_v0")
+    client = get_stub_client({"Paragraph_v0": []}, properties=["text_content"])
+
+    with pytest.raises(HTTPException) as e:
+        get_documents(client, "What is SEIRD?", paragraph_terms=["SEIRD"])
+    assert e.value.status_code == 400
+
+
+def test_get_doc_merges_topic_copies(monkeypatch):
+    monkeypatch.setattr(base, "WEAVIATE_CLASS_NAME", "Paragraph_s")
+    monkeypatch.setattr(base, "WEAVIATE_SHARD_BY_TOPIC", True)
+    covid, dolomites, *others = get_class_names(None, "Paragraph_s", True)
+
+    def row(uuid, distance):
+        return get_row(
+            0, hashed_text=uuid, _additional={"id": uuid, "distance": distance}
+        )
+
+    # A paragraph of both topics is stored in both classes
+    rows = {name: [] for name in others}
+    rows[covid] = [row("a", 0.1), row("b", 0.2)]
+    rows[dolomites] = [row("a", 0.1), row("c", 0.3)]
+    client = get_stub_client(rows)
+
+    documents = get_documents(client, "What is COVID?", top_k=3)
+    assert [doc.hashed_text for doc in documents] == ["a", "b", "c"]
+
+    documents = get_documents(client, "What is COVID?", top_k=2, offset=1)
+    assert [doc.hashed_text for doc in documents] == ["b", "c"]
+
+
+def test_supported_profiles():
+    assert "bq" not in get_supported_profiles("1.22.2")
+    assert {"pq", "bq"} <= set(get_supported_profiles("1.23.0"))
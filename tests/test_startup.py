@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET = 1.0  # seconds
+
+CODE = """
+import sys, time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+print("langchain" in sys.modules)
+"""
+
+
+def test_import_time_budget():
+    """The retriever app imports fast, offline, and without langchain."""
+
+    env = {**os.environ, "WEAVIATE_URL": "http://unreachable.invalid:8080"}
+    result = subprocess.run(
+        [sys.executable, "-c", CODE],
+        cwd="askem/retriever",
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_time, langchain_loaded = result.stdout.split()
+    assert float(import_time) < IMPORT_TIME_BUDGET
+    assert langchain_loaded == "False"
@@ -0,0 +1,58 @@
+from collections import Counter
+
+from askem.blacklist import get_blacklist, mine_blacklist
+from askem.retriever.data_models import Topic
+from askem.terms_extractor import (
+    CapitalizedWordsStrategy,
+    MoreThanOneCapStrategy,
+    MultiStrategyExtractor,
+    extract_paragraph_terms,
+    get_top_k,
+)
+
+TEXT = (
+    "The SEIRD model extends SEIR. SEIRD and SARS-CoV-2 were fit, "
+    "SEIRD again (Smith et al., 2020) with the hnRNP data; SEIR and hnRNP too."
+)
+PARAMS = {"min_length": 3, "min_occurrence": 2, "top_k": 5, "blacklist": []}
+
+
+def test_get_top_k():
+    counts = Counter({"a": 3, "b": 5, "c": 3, "d": 1})
+    assert get_top_k(counts, k=3, min_n=2) == ["b", "a", "c"]
+
+
+def test_multi_strategy_matches_single_strategies():
+    extractor = MultiStrategyExtractor(
+        **PARAMS, strategies=("capitalized", "more_than_one_cap")
+    )
+    terms = extractor.extract_terms(TEXT)
+    assert terms["capitalized"] == CapitalizedWordsStrategy(**PARAMS).extract_terms(
+        TEXT
+    )
+    assert terms["more_than_one_cap"] == MoreThanOneCapStrategy(
+        **PARAMS
+    ).extract_terms(TEXT)
+    assert terms["capitalized"] == ["SEIRD", "SEIR"]
+
+
+def test_extract_paragraph_terms():
+    (terms,) = extract_paragraph_terms([TEXT], topics=["covid"])
+    assert terms[0] == "SEIRD"
+    assert "SARS-CoV-2" not in terms  # Blacklisted
+    assert "hnRNP" in terms
+
+
+def test_blacklist_registry():
+    blacklist = get_blacklist("covid")
+    assert blacklist is get_blacklist(Topic.COVID.value)  # Loaded once
+    assert "SARS-CoV-2" in blacklist
+    assert "Covid" in blacklist  # Case-insensitive
+    assert "DOI" in get_blacklist(Topic.DOLOMITES)  # Common stopterms
+    assert "SEIRD" not in blacklist
+
+
+def test_mine_blacklist():
+    papers = [["COVID", "SEIRD"], ["COVID", "ACE2"], ["COVID"], ["ACE2"]]
+    assert mine_blacklist(papers, min_document_frequency=0.5) == ["ACE2", "COVID"]
+    assert mine_blacklist(papers, min_document_frequency=0.75) == ["COVID"]
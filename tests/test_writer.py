@@ -0,0 +1,92 @@
+import json
+from concurrent.futures import wait
+from types import SimpleNamespace
+
+import pytest
+
+from askem.retriever.writer import BatchWriter, replay_failures
+
+
+class StubBatch:
+    """Manual batching API of a weaviate client, failing objects with `fail` set."""
+
+    def __init__(self, written: list) -> None:
+        self.written = written
+        self.objects = []
+        self.references = []
+
+    def configure(self, **kwargs) -> None:
+        pass
+
+    def empty_objects(self) -> None:
+        self.objects = []
+
+    def empty_references(self) -> None:
+        self.references = []
+
+    def add_data_object(self, data_object, class_name, uuid=None, vector=None):
+        self.objects.append(data_object)
+
+    def add_reference(self, **reference) -> None:
+        self.references.append(reference)
+
+    def create_objects(self) -> list[dict]:
+        results = []
+        for obj in self.objects:
+            if obj.get("fail"):
+                errors = {"error": [{"message": "invalid object"}]}
+                results.append({"result": {"errors": errors}})
+            else:
+                self.written.append(obj)
+                results.append({"result": {}})
+        return results
+
+    def create_references(self) -> list[dict]:
+        return [{"result": {}} for _ in self.references]
+
+
+def get_writer(written: list, **kwargs) -> BatchWriter:
+    return BatchWriter(
+        lambda: SimpleNamespace(batch=StubBatch(written)), backoff=0, **kwargs
+    )
+
+
+def test_writer_writes_all_objects():
+    written = []
+    with get_writer(written, workers=3, batch_size=4, min_batch_size=2) as writer:
+        for i in range(50):
+            writer.add_object({"i": i}, "Paragraph")
+
+    assert sorted(obj["i"] for obj in written) == list(range(50))
+    assert writer.batch_size > 4  # Fast batches grow
+
+
+def test_writer_logs_failures(tmp_path):
+    written = []
+    failure_log = tmp_path / "failed.jsonl"
+    with get_writer(written, failure_log=failure_log, max_retries=2) as writer:
+        writer.add_object({"i": 0}, "Paragraph")
+        writer.add_object({"i": 1, "fail": True}, "Paragraph", uuid="uuid-1")
+
+    assert writer.stats["object_retries"] == 2
+    failures = [json.loads(line) for line in failure_log.read_text().splitlines()]
+    assert len(failures) == 1
+    assert failures[0]["item"]["uuid"] == "uuid-1"
+    assert failures[0]["error"] == "invalid object"
+
+    with get_writer(written, failure_log=tmp_path / "replay.jsonl") as writer:
+        assert replay_failures(writer, failure_log) == 1
+
+
+def test_writer_raises_batch_errors(tmp_path):
+    # The failure log can't be written, it is a directory
+    writer = get_writer(
+        [], failure_log=tmp_path, max_retries=0, batch_size=1, max_batch_size=1
+    )
+    writer.add_object({"i": 0, "fail": True}, "Paragraph")
+    writer.flush()
+    wait(writer._futures)
+
+    with pytest.raises(IsADirectoryError):
+        writer.add_object({"i": 1}, "Paragraph")
+        writer.add_object({"i": 2}, "Paragraph")